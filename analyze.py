@@ -0,0 +1,262 @@
+"""
+Offline batch analyzer
+Runs the live color pipeline (crop_percent, downsample, compute_color and
+rgb_to_hsv_vibrant) over a captured frame sequence, split across a
+process pool, and writes the resulting color timeline. Used to tune
+weighting and hue_adjustments against whole films without a screen or a
+bulb. Frames are independent: the capture-side state of the live engine
+(auto-crop, window tracking, tiles, scene cuts, adaptive downsampling) is
+not involved. Frames that fail are left out of the timeline and reported.
+
+Input is either a directory of frames (.npy arrays, or images when Pillow
+is installed) or a raw dump of consecutive frames, e.g. from
+    ffmpeg -i film.mkv -vf scale=640:-2 -f rawvideo -pix_fmt bgra film.raw
+
+Usage:
+    python analyze.py FRAMES_DIR [--out timeline.npy] [--workers N]
+    python analyze.py film.raw --size 640x272 [--pix-fmt bgra] [--scaling]
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+import numpy as np
+from config import load_config, get_config, set_active_config
+from color_utils import compute_color, get_capture_region, rgb_to_hsv_vibrant
+from downsample import get_downsample
+from profiles import switch_profile
+
+try:
+    from PIL import Image
+
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+PIXEL_FORMATS = {"bgra": 4, "rgba": 4, "bgr24": 3, "rgb24": 3}
+CHUNK = 64
+SHOWN_ERRORS = 5
+
+TIMELINE = np.dtype(
+    [
+        ("frame", "<u4"),
+        ("r", "u1"),
+        ("g", "u1"),
+        ("b", "u1"),
+        ("h", "<u2"),
+        ("s", "u1"),
+        ("v", "u1"),
+    ]
+)
+
+
+def to_bgra(frame, pix_fmt):
+    """Convert a frame to the BGRA layout mss produces"""
+    if pix_fmt == "bgra":
+        return frame
+    bgra = np.empty(frame.shape[:2] + (4,), dtype=np.uint8)
+    order = [2, 1, 0] if pix_fmt.startswith("rgb") else [0, 1, 2]
+    bgra[..., :3] = frame[..., order]
+    bgra[..., 3] = 255
+    return bgra
+
+
+class FrameSource:
+    """Random access to the frames of a directory or raw dump"""
+
+    def __init__(self, path, size=None, pix_fmt="bgra"):
+        self.path = path
+        self.pix_fmt = pix_fmt
+        if os.path.isdir(path):
+            self.files = sorted(
+                os.path.join(path, name)
+                for name in os.listdir(path)
+                if name.lower().endswith((".npy",) + IMAGE_EXTENSIONS)
+            )
+            self.raw = None
+        else:
+            if size is None:
+                raise ValueError("--size is required for raw frame dumps")
+            width, height = size
+            channels = PIXEL_FORMATS[pix_fmt]
+            self.files = None
+            self.raw = np.memmap(path, dtype=np.uint8, mode="r")
+            frames = self.raw.size // (width * height * channels)
+            self.raw = self.raw[: frames * width * height * channels].reshape(
+                frames, height, width, channels
+            )
+
+    def __len__(self):
+        return len(self.raw) if self.raw is not None else len(self.files)
+
+    def __getitem__(self, index):
+        """Frame as a BGRA uint8 array"""
+        if self.raw is not None:
+            return to_bgra(self.raw[index], self.pix_fmt)
+
+        path = self.files[index]
+        if path.endswith(".npy"):
+            frame = np.load(path)
+            return frame if frame.shape[2] == 4 else to_bgra(frame, "bgr24")
+        if not PIL_AVAILABLE:
+            raise RuntimeError("Reading images needs Pillow (pip install Pillow)")
+        with Image.open(path) as image:
+            return to_bgra(np.asarray(image.convert("RGB")), "rgb24")
+
+
+_source = None
+
+
+def _init_worker(config, source_args):
+    global _source
+    set_active_config(config)
+    _source = FrameSource(*source_args)
+    # Pay for buffer allocation and kernel compilation before timing starts
+    if len(_source):
+        analyze_chunk((0, 1))
+
+
+def _ready(_):
+    return os.getpid()
+
+
+def frame_color(frame, config):
+    """Color of one BGRA frame, cropped and subsampled as the engine would"""
+    height, width = frame.shape[:2]
+    monitor = {"left": 0, "top": 0, "width": width, "height": height}
+    region = get_capture_region(monitor, config["capture"]["crop_percent"])
+    top, left = region["top"], region["left"]
+    step = get_downsample(config)
+    frame = frame[
+        top : top + region["height"] : step, left : left + region["width"] : step
+    ]
+    return compute_color(frame, config)
+
+
+def analyze_chunk(bounds):
+    """
+    Run the pipeline over frames [start, stop) in a worker
+
+    Returns:
+        (timeline rows of the frames that succeeded, [(index, error)])
+    """
+    start, stop = bounds
+    config = get_config()
+    timeline = np.zeros(stop - start, dtype=TIMELINE)
+    errors = []
+    row = 0
+    for index in range(start, stop):
+        try:
+            r, g, b = frame_color(_source[index], config)
+            h, s, v = rgb_to_hsv_vibrant(r, g, b)
+        except Exception as e:
+            errors.append((index, f"{type(e).__name__}: {e}"))
+            continue
+        timeline[row] = (index, r, g, b, h, s, v)
+        row += 1
+    return timeline[:row], errors
+
+
+def analyze(source_args, workers, config, limit=None):
+    """
+    Analyze a sequence with a pool of workers
+
+    Returns:
+        (timeline array, [(index, error)] of failed frames,
+        seconds taken once the workers are warm)
+    """
+    count = len(FrameSource(*source_args))
+    if limit:
+        count = min(count, limit)
+    chunks = [(i, min(i + CHUNK, count)) for i in range(0, count, CHUNK)]
+
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(config, source_args)
+    ) as pool:
+        pool.map(_ready, range(workers * 4), chunksize=1)
+        start = time.perf_counter()
+        parts = pool.map(analyze_chunk, chunks, chunksize=1)
+        seconds = time.perf_counter() - start
+    timeline = np.zeros(0, dtype=TIMELINE)
+    if parts:
+        timeline = np.concatenate([part for part, _ in parts])
+    errors = [error for _, part_errors in parts for error in part_errors]
+    return timeline, errors, seconds
+
+
+def write_timeline(timeline, path):
+    """Write the timeline as .npy (10 bytes per frame) or .csv"""
+    if path.endswith(".csv"):
+        np.savetxt(
+            path,
+            timeline,
+            fmt="%d",
+            delimiter=",",
+            header=",".join(TIMELINE.names),
+            comments="",
+        )
+    else:
+        np.save(path, timeline)
+
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline color timeline analyzer")
+    parser.add_argument("input", help="frame directory or raw frame dump")
+    parser.add_argument("--size", type=parse_size, help="WxH of a raw dump")
+    parser.add_argument("--pix-fmt", choices=sorted(PIXEL_FORMATS), default="bgra")
+    parser.add_argument("--out", default="timeline.npy", help=".npy or .csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--limit", type=int, help="only the first N frames")
+    parser.add_argument("--profile", help="analyze with a named profile")
+    parser.add_argument(
+        "--scaling", action="store_true", help="also time 1, 2, 4... workers"
+    )
+    args = parser.parse_args()
+
+    load_config()
+    if args.profile and not switch_profile(args.profile):
+        return
+    config = get_config()
+    source_args = (args.input, args.size, args.pix_fmt)
+
+    timeline, errors, seconds = analyze(source_args, args.workers, config, args.limit)
+    write_timeline(timeline, args.out)
+    frames = len(timeline) + len(errors)
+    print(
+        f"{frames} frames with {args.workers} worker(s) in {seconds:.2f}s: "
+        f"{frames / seconds:.0f} frames/s, timeline written to {args.out}"
+    )
+    if errors:
+        print(f"{len(errors)} frame(s) failed and are missing from the timeline:")
+        for index, error in errors[:SHOWN_ERRORS]:
+            print(f"  frame {index}: {error}")
+        if len(errors) > SHOWN_ERRORS:
+            print(f"  ... and {len(errors) - SHOWN_ERRORS} more")
+
+    if args.scaling:
+        counts = [1]
+        while counts[-1] * 2 <= args.workers:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != args.workers:
+            counts.append(args.workers)
+        base = None
+        for workers in counts:
+            _, _, seconds = analyze(source_args, workers, config, args.limit)
+            fps = frames / seconds
+            base = base or fps
+            print(
+                f"  {workers:3d} worker(s)  {fps:8.0f} frames/s  "
+                f"speedup {fps / base:5.2f}x  "
+                f"efficiency {fps / base / workers * 100:5.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
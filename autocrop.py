@@ -0,0 +1,161 @@
+"""
+Automatic letterbox / pillarbox detection
+Samples a few thin strips of the monitor about once a second and shrinks
+the capture area to the content inside uniform black bars
+"""
+
+import time
+import numpy as np
+
+SAMPLE_PX = 8
+SAMPLE_POSITIONS = (0.25, 0.5, 0.75)
+CONFIRM_SAMPLES = 3
+TOLERANCE = 0.01
+MAX_BAR = 1 / 3
+
+
+class AutoCrop:
+    """Tracks black bars on one monitor with hysteresis"""
+
+    def __init__(self):
+        self.bars = (0, 0)
+        self.pending = None
+        self.pending_count = 0
+        self.last_check = 0
+        self.monitor_key = None
+
+    def reset(self):
+        """Forget detected bars, e.g. after a monitor change"""
+        self.bars = (0, 0)
+        self.pending = None
+        self.pending_count = 0
+        self.last_check = 0
+
+    def content_rect(self, sct, monitor, config):
+        """
+        Get the monitor area without black bars
+
+        Args:
+            sct: MSS instance used for the periodic strip samples
+            monitor: Monitor dictionary with left, top, width, height
+            config: Config dictionary
+
+        Returns:
+            Rectangle dictionary in the same format as the monitor
+        """
+        capture = config["capture"]
+        if not capture.get("auto_crop", 0):
+            return monitor
+
+        key = (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+        if key != self.monitor_key:
+            self.monitor_key = key
+            self.reset()
+
+        now = time.monotonic()
+        if now - self.last_check >= capture.get("auto_crop_interval", 1.0):
+            self.last_check = now
+            detected = self.detect(sct, monitor, capture.get("auto_crop_threshold", 16))
+            self.update(detected, (monitor["height"], monitor["width"]))
+
+        bar_y, bar_x = self.bars
+        return {
+            "left": monitor["left"] + bar_x,
+            "top": monitor["top"] + bar_y,
+            "width": monitor["width"] - 2 * bar_x,
+            "height": monitor["height"] - 2 * bar_y,
+        }
+
+    def detect(self, sct, monitor, threshold):
+        """
+        Measure black bar sizes from thin vertical and horizontal strips
+
+        Returns:
+            Tuple of (top/bottom bar, left/right bar) in pixels, or None when
+            the samples are entirely black and nothing can be decided
+        """
+        w, h = monitor["width"], monitor["height"]
+
+        rows = np.zeros(h, dtype=bool)
+        cols = np.zeros(w, dtype=bool)
+        for pos in SAMPLE_POSITIONS:
+            column = sct.grab(
+                {
+                    "left": monitor["left"] + min(int(w * pos), w - SAMPLE_PX),
+                    "top": monitor["top"],
+                    "width": SAMPLE_PX,
+                    "height": h,
+                }
+            )
+            rows |= np.asarray(column)[:, :, :3].max(axis=(1, 2)) > threshold
+
+            row = sct.grab(
+                {
+                    "left": monitor["left"],
+                    "top": monitor["top"] + min(int(h * pos), h - SAMPLE_PX),
+                    "width": w,
+                    "height": SAMPLE_PX,
+                }
+            )
+            cols |= np.asarray(row)[:, :, :3].max(axis=(0, 2)) > threshold
+
+        if not rows.any() or not cols.any():
+            return None
+
+        return _bar_size(rows), _bar_size(cols)
+
+    def update(self, detected, dims):
+        """
+        Apply a detection result with hysteresis
+
+        Content showing up inside a cropped bar expands the crop right away.
+        Shrinking only happens once the same larger bars were seen
+        CONFIRM_SAMPLES times in a row, so dark scenes don't make it flap.
+        """
+        if detected is None:
+            return
+
+        tolerance = [max(int(d * TOLERANCE), 1) for d in dims]
+        detected = tuple(min(bar, int(d * MAX_BAR)) for bar, d in zip(detected, dims))
+
+        bars = [
+            bar if bar < cur - tol else cur
+            for bar, cur, tol in zip(detected, self.bars, tolerance)
+        ]
+        self.bars = tuple(bars)
+
+        grows = any(bar > cur + tol for bar, cur, tol in zip(detected, bars, tolerance))
+        if not grows:
+            self.pending = None
+            self.pending_count = 0
+            return
+
+        if self.pending is not None and all(
+            abs(bar - pend) <= tol
+            for bar, pend, tol in zip(detected, self.pending, tolerance)
+        ):
+            self.pending = tuple(min(p, bar) for p, bar in zip(self.pending, detected))
+            self.pending_count += 1
+        else:
+            self.pending = detected
+            self.pending_count = 1
+
+        if self.pending_count >= CONFIRM_SAMPLES:
+            self.bars = tuple(max(p, cur) for p, cur in zip(self.pending, bars))
+            self.pending = None
+            self.pending_count = 0
+
+
+def _bar_size(content):
+    """Size of the smaller of the two black runs at the ends of a line"""
+    leading = int(np.argmax(content))
+    trailing = int(np.argmax(content[::-1]))
+    return min(leading, trailing)
+
+
+_auto_crop = AutoCrop()
+
+
+def get_content_rect(sct, monitor, config):
+    """Get the monitor area with detected black bars removed"""
+    return _auto_crop.content_rect(sct, monitor, config)
@@ -0,0 +1,1078 @@
+"""
+Benchmarks for the color pipeline
+Runs against synthetic frames so no display, mss or bulb is needed
+
+Usage:
+    python benchmark.py algorithms [--size 1920x1080] [--frames 200]
+    python benchmark.py kernel [--size 1920x1080] [--frames 200]
+    python benchmark.py allocations [--size 1920x1080] [--limit 4096]
+    python benchmark.py engine [--bulbs 1] [--seconds 10] [--latency 0.02]
+    python benchmark.py edges [--size 1920x1080] [--frames 200]
+    python benchmark.py tiles [--size 1920x1080] [--frames 100]
+    python benchmark.py xdamage [--size 1920x1080] [--frames 200] [--area 0.1]
+    xvfb-run -s "-screen 0 1280x720x24" python benchmark.py xdamage --live
+    python benchmark.py downsample [--budget 8] [--seconds 3]
+    python benchmark.py scenecut [--size 1920x1080] [--frames 600] [--scene 48]
+    python benchmark.py stream [--transport udp] [--frames 20000] [--zones 26]
+    python benchmark.py led [--protocol ddp] [--pixels 1000] [--frames 5000]
+    xvfb-run -s "-screen 0 1920x1080x24" python benchmark.py window [--frames 100]
+"""
+
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+import numpy as np
+from config import load_config, get_config
+from profiles import merge
+from governor import govern
+from color_utils import compute_color, weighted_mean_color
+from bulb import discover_bulb
+from supervisor import BulbSupervisor
+from simulator import simulator_hosts, simulator_process
+from color_utils import grab_frame, get_average_color_fast
+from edges import get_edge_colors
+import kernels
+import xdamage
+import xwindow
+from downsample import get_downsample
+from scenecut import SceneCutDetector
+from colorstream import ColorStreamSender, ColorStreamReceiver, HEADER
+import socket
+import struct
+import ledstream
+from ledstream import (
+    DDPOutput,
+    E131Output,
+    DDP_HEADER,
+    DDP_VERSION,
+    DDP_PUSH,
+    DDP_TYPE_RGB24,
+    E131_HEADER_SIZE,
+    E131_MAX_SLOTS,
+    ACN_PACKET_ID,
+)
+
+
+def make_frame(width, height, seed=0):
+    """
+    Build a synthetic BGRA frame with two strong colors and some noise
+
+    Left half is saturated red, right half saturated blue, which is the
+    case where a plain weighted mean drifts towards a muddy purple/grey.
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.zeros((height, width, 4), dtype=np.uint8)
+    frame[:, : width // 2] = (20, 30, 220, 255)
+    frame[:, width // 2 :] = (210, 40, 25, 255)
+    noise = rng.integers(-20, 21, size=(height, width, 3))
+    frame[:, :, :3] = np.clip(frame[:, :, :3].astype(np.int16) + noise, 0, 255)
+    return frame
+
+
+class SyntheticScreen:
+    """Stand-in for an mss instance that serves regions of a fixed frame"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        height, width = frame.shape[:2]
+        monitor = {"left": 0, "top": 0, "width": width, "height": height}
+        self.monitors = [monitor, monitor]
+        self.grabbed_pixels = 0
+
+    def grab(self, region):
+        self.grabbed_pixels += region["width"] * region["height"]
+        top, left = region["top"], region["left"]
+        return self.frame[
+            top : top + region["height"], left : left + region["width"]
+        ].copy()
+
+
+def make_scene(width, height, seed=0):
+    """
+    Build a synthetic BGRA frame with smooth, uneven color regions
+
+    A coarse random grid upscaled with blocky edges, closer to real content
+    than make_frame when measuring how well a sparse sample tracks the
+    full-frame color.
+    """
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(6, 10, 4), dtype=np.uint8)
+    coarse[:, :, 3] = 255
+    rows = np.arange(height) * coarse.shape[0] // height
+    cols = np.arange(width) * coarse.shape[1] // width
+    return np.ascontiguousarray(coarse[rows][:, cols])
+
+
+def downsampled(frame):
+    """Apply the configured downsample the same way grab_frame does"""
+    downsample = get_downsample(get_config())
+    if downsample > 1:
+        return frame[::downsample, ::downsample, :]
+    return frame
+
+
+def time_per_frame(func, frames, repeat):
+    """Average seconds per call of func over the frame list"""
+    func(frames[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            func(frame)
+    return (time.perf_counter() - start) / (repeat * len(frames))
+
+
+def bench_algorithms(args):
+    """Compare the weighted mean against the histogram dominant color"""
+    config = get_config()
+    width, height = args.width, args.height
+    frames = [downsampled(make_frame(width, height, seed)) for seed in range(4)]
+    repeat = max(args.frames // len(frames), 1)
+
+    print(
+        f"Frame {width}x{height}, downsample "
+        f"{config['capture'].get('downsample', 4)}, "
+        f"{frames[0].shape[1]}x{frames[0].shape[0]} pixels processed"
+    )
+
+    original = config["capture"].get("algorithm", "mean")
+    try:
+        for algorithm in ("mean", "histogram"):
+            config["capture"]["algorithm"] = algorithm
+            seconds = time_per_frame(compute_color, frames, repeat)
+            color = compute_color(frames[0])
+            print(
+                f"  {algorithm:<10} {seconds * 1000:8.3f} ms/frame "
+                f"{1 / seconds:9.1f} fps  color={tuple(int(c) for c in color)}"
+            )
+    finally:
+        config["capture"]["algorithm"] = original
+
+
+def bench_kernel(args):
+    """Check the JIT kernel against the NumPy weighted mean and time both"""
+    if not kernels.NUMBA_AVAILABLE:
+        print("numba not installed, nothing to compare")
+        return
+
+    config = get_config()
+    rng = np.random.default_rng(1)
+    frames = [
+        downsampled(make_frame(args.width, args.height, seed)) for seed in range(4)
+    ]
+    frames += [
+        downsampled(rng.integers(0, 256, (args.height, args.width, 4), dtype=np.uint8))
+        for _ in range(16)
+    ]
+
+    max_diff = 0
+    for frame in frames:
+        expected = weighted_mean_color(frame, config)
+        actual = kernels.weighted_mean_color_jit(frame, config)
+        max_diff = max(
+            max_diff, max(abs(int(a) - int(e)) for a, e in zip(actual, expected))
+        )
+    print(f"Max channel difference over {len(frames)} frames: {max_diff}")
+
+    repeat = max(args.frames // len(frames), 1)
+    numpy_time = time_per_frame(
+        lambda f: weighted_mean_color(f, config), frames, repeat
+    )
+    jit_time = time_per_frame(
+        lambda f: kernels.weighted_mean_color_jit(f, config), frames, repeat
+    )
+    print(f"  numpy      {numpy_time * 1000:8.3f} ms/frame")
+    print(
+        f"  numba      {jit_time * 1000:8.3f} ms/frame  "
+        f"({numpy_time / jit_time:.1f}x faster)"
+    )
+
+
+def peak_frame_allocation(frames, config, count):
+    """
+    Largest peak of traced memory, in bytes, allocated by one warm
+    weighted_mean_color call over count frames cycled from frames
+    """
+    for frame in frames:
+        weighted_mean_color(frame, config)
+
+    tracemalloc.start()
+    worst = 0
+    try:
+        for i in range(count):
+            frame = frames[i % len(frames)]
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            weighted_mean_color(frame, config)
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def bench_allocations(args):
+    """
+    Verify the NumPy weighted mean does not allocate per frame once warm
+
+    Fails with exit code 1 if any frame's peak traced memory grows by more
+    than --limit bytes, which is far below the size of a single frame buffer.
+    """
+    config = get_config()
+    frames = [
+        downsampled(make_frame(args.width, args.height, seed)) for seed in range(4)
+    ]
+    worst = peak_frame_allocation(frames, config, args.frames)
+
+    frame_bytes = frames[0].shape[0] * frames[0].shape[1] * 3 * 4
+    print(
+        f"Peak per-frame allocation over {args.frames} frames: {worst} bytes "
+        f"(one float32 RGB frame is {frame_bytes} bytes)"
+    )
+    if worst > args.limit:
+        print(f"FAIL: more than {args.limit} bytes allocated per frame")
+        sys.exit(1)
+    print("OK")
+
+
+async def drive_engine(screen, supervisor, seconds, on_frame=None):
+    """
+    Run the app's own sync loop (govern, then main.run_iteration) against a
+    screen stand-in and a supervisor, the way main.main() does
+    """
+    import main
+
+    main.sct = screen
+    main.supervisor = supervisor
+    await supervisor.wait_connected()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        config = govern(get_config())
+        await main.run_iteration(config, 1)
+        if on_frame:
+            on_frame()
+
+
+def engine_process(host, seconds, delay, conn):
+    """One engine instance driving one simulated bulb, in its own process"""
+    import main
+
+    load_config()
+    get_config()["capture"]["update_delay"] = delay
+    frames = [make_frame(1920, 1080, seed) for seed in range(4)]
+    screen = SyntheticScreen(frames[0])
+    count = itertools.count(1)
+    # Keep every sample instead of the debug tab's last 100
+    latency = main.stats["latency"]
+    latency["normal"], latency["cut"] = deque(), deque()
+
+    def next_frame():
+        screen.frame = frames[next(count) % len(frames)]
+
+    # Compile kernels and fill caches before anything is timed
+    get_average_color_fast(screen, 1)
+
+    async def run():
+        supervisor = BulbSupervisor(lambda: discover_bulb(host))
+        task = asyncio.create_task(supervisor.run())
+        try:
+            await supervisor.wait_connected()
+            cpu_start = time.process_time()
+            await drive_engine(screen, supervisor, seconds, next_frame)
+            cpu = time.process_time() - cpu_start
+        finally:
+            task.cancel()
+            if supervisor.bulb:
+                await supervisor.bulb.disconnect()
+        return supervisor, cpu
+
+    supervisor, cpu = asyncio.run(run())
+    conn.send(
+        {
+            "latencies": list(latency["normal"]) + list(latency["cut"]),
+            "cpu": cpu,
+            "rate": supervisor.rate.rate,
+            "srtt": supervisor.rate.srtt or 0,
+            "errors": supervisor.rate.errors,
+            "reconnects": supervisor.reconnects,
+        }
+    )
+
+
+def bench_engine(args):
+    """
+    Run the real engine loop against simulated bulbs, one engine process
+    per bulb as with one app instance per bulb
+
+    Latency is capture-to-acknowledged, as recorded by main.run_iteration.
+    """
+    config = get_config()
+    delay = config["capture"]["update_delay"] if args.delay is None else args.delay
+    hosts = simulator_hosts(args.bulbs)
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=simulator_process,
+        args=(args.bulbs, args.latency, args.jitter, args.drop, child),
+        daemon=True,
+    )
+    process.start()
+    parent.recv()
+
+    engines = []
+    try:
+        for host in hosts:
+            receive, send = multiprocessing.Pipe(duplex=False)
+            engine = multiprocessing.Process(
+                target=engine_process, args=(host, args.seconds, delay, send)
+            )
+            engine.start()
+            # Only the child holds the sending end, so its exit ends recv()
+            send.close()
+            engines.append((engine, receive))
+        results = []
+        for engine, receive in engines:
+            try:
+                results.append(receive.recv())
+            except EOFError:
+                pass
+    finally:
+        for engine, _ in engines:
+            engine.join()
+        parent.send("stop")
+        simulated = parent.recv()
+        process.join()
+
+    failed = [engine.exitcode for engine, _ in engines if engine.exitcode]
+    if failed or len(results) < len(engines):
+        print(f"FAIL: engine process(es) exited without results, codes {failed}")
+        sys.exit(1)
+
+    latencies = [value for result in results for value in result["latencies"]]
+    total = len(latencies)
+    cpu = sum(result["cpu"] for result in results)
+    reconnects = sum(result["reconnects"] for result in results)
+    for result in results:
+        print(
+            f"  {result['rate']:5.1f} Hz adaptive rate, "
+            f"{result['srtt'] * 1000:.1f} ms smoothed RTT, "
+            f"{result['errors']} errors"
+        )
+
+    print(
+        f"{args.bulbs} simulated bulb(s), {args.seconds}s, update_delay {delay}s, "
+        f"latency {args.latency}s +/- {args.jitter}s, drop rate {args.drop}"
+    )
+    print(f"  commands/s      {total / args.seconds:8.1f} total")
+    print(f"  commands/s      {total / args.seconds / args.bulbs:8.1f} per bulb")
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"  capture->ack    p50 {p50:.2f} ms  p95 {p95:.2f} ms  p99 {p99:.2f} ms")
+    print(f"  engine CPU      {cpu / args.seconds / args.bulbs * 100:8.1f} % per bulb")
+    print(f"  simulator CPU   {simulated['cpu']:8.2f} s")
+    print(f"  reconnects      {reconnects:8d}")
+
+
+def bench_edges(args):
+    """Compare grabbed pixels and time for full-frame vs edge-strip capture"""
+    config = get_config()
+    screen = SyntheticScreen(make_frame(args.width, args.height))
+
+    def run(mode, func):
+        config["capture"]["mode"] = mode
+        screen.grabbed_pixels = 0
+        func(screen, 1)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            func(screen, 1)
+        seconds = (time.perf_counter() - start) / args.frames
+        pixels = screen.grabbed_pixels // (args.frames + 1)
+        print(f"  {mode:<6} {pixels:9d} px grabbed  {seconds * 1000:8.3f} ms/frame")
+        return pixels
+
+    original = config["capture"].get("mode", "full")
+    try:
+        print(f"Frame {args.width}x{args.height}")
+        full = run("full", lambda sct, i: compute_color(grab_frame(sct, i)))
+        edges = run("edges", get_edge_colors)
+        monitor_pixels = args.width * args.height
+        print(
+            f"  edge capture grabs {monitor_pixels / edges:.1f}x fewer pixels than "
+            f"the whole monitor, {full / edges:.1f}x fewer than the cropped region"
+        )
+        config["capture"]["mode"] = "edges"
+        overall, segments = get_edge_colors(screen, 1)
+        print(f"  {len(segments)} segments, overall color {overall}")
+    finally:
+        config["capture"]["mode"] = original
+
+
+def bench_tiles(args):
+    """Bandwidth and color error of sparse tiles against the full grab"""
+    config = get_config()
+    original = config["capture"].get("mode", "full")
+    layout = config["capture"].get("tile_layout", "stratified")
+
+    results = {"full": [0, 0.0], "tiles": [0, 0.0]}
+    errors = []
+    try:
+        for seed in range(args.frames):
+            screen = SyntheticScreen(make_scene(args.width, args.height, seed))
+            colors = {}
+            for mode in ("full", "tiles"):
+                config["capture"]["mode"] = mode
+                screen.grabbed_pixels = 0
+                start = time.perf_counter()
+                colors[mode] = compute_color(grab_frame(screen, 1))
+                results[mode][0] += screen.grabbed_pixels
+                results[mode][1] += time.perf_counter() - start
+            errors.append(
+                np.linalg.norm(
+                    np.subtract(colors["tiles"], colors["full"], dtype=float)
+                )
+            )
+    finally:
+        config["capture"]["mode"] = original
+
+    print(f"Frame {args.width}x{args.height}, {layout} tiles, {args.frames} scenes")
+    for mode, (pixels, seconds) in results.items():
+        print(
+            f"  {mode:<6} {pixels // args.frames:9d} px grabbed  "
+            f"{seconds / args.frames * 1000:8.3f} ms/frame"
+        )
+    print(f"  tiles grab {results['full'][0] / results['tiles'][0]:.1f}x fewer pixels")
+    print(
+        f"  RGB distance to full frame: mean {np.mean(errors):.1f}, "
+        f"p95 {np.percentile(errors, 95):.1f}, max {np.max(errors):.1f}"
+    )
+
+
+class ScriptedDamage:
+    """Stand-in for DamageWatcher that reports the rectangles it is given"""
+
+    def __init__(self):
+        self.rects = []
+
+    def take(self, region):
+        rects, self.rects = self.rects, []
+        return rects
+
+
+def bench_xdamage_live(args):
+    """Repaint a window on the real X server and count recomputed frames"""
+    import mss
+    from Xlib import display as xdisplay
+
+    conn = xdisplay.Display()
+    screen = conn.screen()
+    window = screen.root.create_window(
+        0, 0, 320, 240, 0, screen.root_depth, background_pixel=screen.black_pixel
+    )
+    window.map()
+    gc = window.create_gc()
+    conn.sync()
+
+    config = get_config()
+    config["capture"]["auto_crop"] = 0
+    counts = {"changed": 0, "idle": 0}
+    with mss.mss() as sct:
+        xdamage.get_damage_color(sct, 1)
+        for i in range(args.frames):
+            if i % 4 == 0:
+                gc.change(foreground=(i * 2654435761) & 0xFFFFFF)
+                window.fill_rectangle(gc, 0, 0, 320, 240)
+                conn.sync()
+            time.sleep(0.01)
+            result = xdamage.get_damage_color(sct, 1)
+            if result is None:
+                print("XDamage not available on this display")
+                sys.exit(1)
+            counts["changed" if result[1] else "idle"] += 1
+
+    capture = xdamage._capture
+    print(f"{args.frames} polls, window repainted every 4th")
+    print(f"  recomputed {counts['changed']}, skipped {counts['idle']}")
+    print(f"  {capture.watcher.events} damage events, {capture.cells_grabbed} cells")
+    if counts["changed"] > args.frames // 4 + 2:
+        sys.exit(1)
+
+
+def bench_xdamage(args):
+    """Damage-driven cell updates against full regrabs of a partly changing screen"""
+    if args.live:
+        return bench_xdamage_live(args)
+
+    config = get_config()
+    config["capture"]["auto_crop"] = 0
+    width, height = args.width, args.height
+    screen = SyntheticScreen(make_scene(width, height))
+    region = xdamage.get_active_region(screen, 1, config)
+
+    # A "video" rectangle in the middle of an otherwise static desktop
+    box_w = int(width * args.area**0.5)
+    box_h = int(height * args.area**0.5)
+    box = ((width - box_w) // 2, (height - box_h) // 2)
+    box = box + (box[0] + box_w, box[1] + box_h)
+
+    watcher = ScriptedDamage()
+    capture = xdamage.DamageCapture(watcher)
+    capture.update(screen, region, config)
+
+    totals = {"full": [0, 0.0], "xdamage": [0, 0.0]}
+    errors = []
+    for seed in range(args.frames):
+        scene = make_scene(box_w, box_h, seed + 1)
+        screen.frame[box[1] : box[3], box[0] : box[2]] = scene
+        watcher.rects.append(box)
+
+        screen.grabbed_pixels = 0
+        start = time.perf_counter()
+        full = compute_color(grab_frame(screen, 1))
+        totals["full"][1] += time.perf_counter() - start
+        totals["full"][0] += screen.grabbed_pixels
+
+        screen.grabbed_pixels = 0
+        start = time.perf_counter()
+        color, _ = capture.update(screen, region, config)
+        totals["xdamage"][1] += time.perf_counter() - start
+        totals["xdamage"][0] += screen.grabbed_pixels
+
+        errors.append(np.linalg.norm(np.subtract(color, full, dtype=float)))
+
+    screen.grabbed_pixels = 0
+    start = time.perf_counter()
+    _, changed = capture.update(screen, region, config)
+    idle = time.perf_counter() - start
+
+    print(
+        f"Frame {width}x{height}, {args.area:.0%} of the screen changing, "
+        f"{capture.key[4]}x{capture.key[4]} cells"
+    )
+    for mode, (pixels, seconds) in totals.items():
+        print(
+            f"  {mode:<8} {pixels // args.frames:9d} px grabbed  "
+            f"{seconds / args.frames * 1000:8.3f} ms/frame"
+        )
+    print(f"  idle frame: {idle * 1e6:.1f} us, recomputed={changed}")
+    print(
+        f"  RGB distance to full frame: mean {np.mean(errors):.1f}, "
+        f"max {np.max(errors):.1f}"
+    )
+
+    # New weighting on a static screen must not serve the old cached sums
+    tuned = merge(config, {"weighting": {"saturation_power": 3.0}})
+    color, recomputed = capture.update(screen, region, tuned)
+    expected = weighted_mean_color(grab_frame(screen, 1, tuned), tuned)
+    stale = np.linalg.norm(np.subtract(color, expected, dtype=float))
+    print(f"  after a weighting change: recomputed={recomputed}, distance {stale:.1f}")
+    if not recomputed or stale > 2:
+        print("FAIL: cached cells ignored the config change")
+        sys.exit(1)
+    print("OK")
+
+
+def bench_downsample(args):
+    """Factor chosen by the adaptive downsampler for several screen sizes"""
+    config = get_config()
+    capture = config["capture"]
+    original = (capture.get("downsample", 4), capture.get("frame_budget_ms"))
+    capture["downsample"] = "auto"
+    capture["frame_budget_ms"] = args.budget
+    capture["auto_crop"] = 0
+
+    print(f"Budget {args.budget:.1f} ms/frame, {args.seconds:g}s per size")
+    try:
+        for width, height in ((1366, 768), (1920, 1080), (3840, 2160), (7680, 4320)):
+            screen = SyntheticScreen(make_scene(width, height))
+            times = []
+            deadline = time.perf_counter() + args.seconds
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                get_average_color_fast(screen, 1)
+                times.append(time.perf_counter() - start)
+            settled = np.median(times[-len(times) // 4 :]) * 1000
+            print(
+                f"  {width}x{height:<5} factor {get_downsample(config):3d}  "
+                f"{settled:7.2f} ms/frame (median of last quarter)"
+            )
+    finally:
+        capture["downsample"], capture["frame_budget_ms"] = original
+
+
+def bench_scenecut(args):
+    """Detection accuracy and cost of the scene-cut detector"""
+    config = get_config()
+    threshold = config["capture"].get("scene_cut_threshold", 20)
+    rng = np.random.default_rng(0)
+    scenes = [
+        downsampled(make_scene(args.width, args.height, seed))
+        for seed in range(args.frames // args.scene + 1)
+    ]
+
+    detector = SceneCutDetector()
+    hits = misses = false_alarms = 0
+    seconds = 0.0
+    for i in range(args.frames):
+        scene = scenes[i // args.scene]
+        # Within a scene: noise plus a slow global brightness drift
+        drift = int(12 * np.sin(i / 10))
+        frame = np.clip(
+            scene.astype(np.int16)
+            + drift
+            + rng.integers(-15, 16, size=scene.shape, dtype=np.int16),
+            0,
+            255,
+        ).astype(np.uint8)
+
+        start = time.perf_counter()
+        cut = detector.observe(detector.summary(frame), threshold)
+        seconds += time.perf_counter() - start
+
+        expected = i > 0 and i % args.scene == 0
+        hits += cut and expected
+        misses += expected and not cut
+        false_alarms += cut and not expected
+
+    print(
+        f"{args.frames} frames of {scenes[0].shape[1]}x{scenes[0].shape[0]}, "
+        f"a cut every {args.scene} frames, threshold {threshold}"
+    )
+    print(f"  detected {hits}, missed {misses}, false alarms {false_alarms}")
+    print(f"  detector cost {seconds / args.frames * 1e6:.1f} us/frame")
+
+
+def wait_for_window(config, expected, timeout=2.0):
+    """Poll the tracked window rectangle until it equals expected"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if xwindow.get_window_rect(config) == expected:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def bench_window(args):
+    """
+    Track a dummy window on the X server (e.g. Xvfb) and compare the cost
+    of capturing it against capturing the whole monitor
+    """
+    import mss
+    from Xlib import Xatom, display as xdisplay
+
+    conn = xdisplay.Display()
+    screen = conn.screen()
+    root = screen.root
+    window = root.create_window(
+        40, 30, 320, 240, 0, screen.root_depth, background_pixel=screen.white_pixel
+    )
+    window.set_wm_class("benchwindow", "BenchWindow")
+    window.set_wm_name("Benchmark window")
+    window.map()
+    # Stand in for the window manager and mark the window as focused
+    active = conn.intern_atom("_NET_ACTIVE_WINDOW")
+    root.change_property(active, Xatom.WINDOW, 32, [window.id])
+    conn.sync()
+
+    config = get_config()
+    capture = config["capture"]
+    capture.update(auto_crop=0, crop_percent=0, target="active_window")
+    failures = []
+
+    def check(name, expected):
+        if not wait_for_window(config, expected):
+            failures.append(f"{name}: got {xwindow.get_window_rect(config)}")
+
+    def timed():
+        get_average_color_fast(sct, 1)
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            get_average_color_fast(sct, 1)
+        return (time.perf_counter() - start) / args.frames * 1000
+
+    with mss.mss() as sct:
+        check("active window", {"left": 40, "top": 30, "width": 320, "height": 240})
+        root_size = (sct.monitors[1]["width"], sct.monitors[1]["height"])
+        print(f"Monitor {root_size[0]}x{root_size[1]}, {args.frames} frames each")
+
+        for width, height in ((320, 240), (640, 480), (1280, 720)):
+            window.configure(width=width, height=height)
+            conn.sync()
+            check(
+                f"resize to {width}x{height}",
+                {"left": 40, "top": 30, "width": width, "height": height},
+            )
+            print(f"  window  {width:4d}x{height:<4d} {timed():7.2f} ms/frame")
+
+        capture["target"] = "monitor"
+        print(f"  monitor {root_size[0]:4d}x{root_size[1]:<4d} {timed():7.2f} ms/frame")
+
+        window.configure(x=100, y=50, width=400, height=300)
+        conn.sync()
+        capture.update(target="window", window_match="benchwindow")
+        check("match by class", {"left": 100, "top": 50, "width": 400, "height": 300})
+
+        window.unmap()
+        conn.sync()
+        check("unmapped", None)
+
+    tracker = xwindow.get_tracker()
+    print(f"  {tracker.updates} geometry updates")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+def start_receiver(port, transport):
+    """Run a ColorStreamReceiver on localhost in its own event loop thread"""
+    loop = asyncio.new_event_loop()
+    receiver = ColorStreamReceiver()
+    ready = threading.Event()
+    servers = []
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        servers.append(
+            loop.run_until_complete(receiver.serve("127.0.0.1", port, transport))
+        )
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+
+    async def shutdown():
+        server = servers[0]
+        server.close()
+        # Whatever is left are the TCP connection handlers, which end on
+        # their own once the sender has closed its side
+        handlers = asyncio.all_tasks() - {asyncio.current_task()}
+        if handlers:
+            _, pending = await asyncio.wait(handlers, timeout=1.0)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if transport == "tcp":
+            await server.wait_closed()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return receiver, stop
+
+
+def wait_settled(receiver):
+    """Wait until the receiver stops getting packets"""
+    count = -1
+    while count != receiver.received + receiver.stale:
+        count = receiver.received + receiver.stale
+        time.sleep(0.2)
+
+
+def bench_stream(args):
+    """
+    Capture node -> controller node over localhost
+
+    Latency is the time from packing a frame to the receiver accepting
+    it, i.e. what the network hop adds on top of the local pipeline.
+    """
+    receiver, stop = start_receiver(args.port, args.transport)
+    sender = ColorStreamSender("127.0.0.1", args.port, args.transport)
+    colors = [(i % 256, (i * 7) % 256, (i * 13) % 256) for i in range(args.zones + 1)]
+    print(
+        f"{args.transport.upper()} on localhost, {len(colors)} colors "
+        f"({HEADER.size + 3 * len(colors)} bytes) per frame"
+    )
+
+    try:
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            sender.send(colors)
+        elapsed = time.perf_counter() - start
+        wait_settled(receiver)
+        print(f"  send cost       {elapsed / args.frames * 1e6:8.2f} us/frame")
+        print(f"  throughput      {args.frames / elapsed:8.0f} frames/s sent")
+        print(
+            f"  received        {receiver.received:8d} "
+            f"({args.frames - receiver.received} lost, {sender.dropped} dropped)"
+        )
+
+        # Paced run so latency is not dominated by queueing
+        receiver.latency.clear()
+        for _ in range(receiver.latency.maxlen):
+            sender.send(colors)
+            time.sleep(1 / args.rate)
+        wait_settled(receiver)
+        p50, p95, p99 = np.percentile(receiver.latency, [50, 95, 99])
+        print(
+            f"  added latency   p50 {p50:.3f} ms  p95 {p95:.3f} ms  "
+            f"p99 {p99:.3f} ms at {args.rate:.0f} frames/s"
+        )
+
+        # A replayed sequence number must be dropped as stale
+        stale = receiver.stale
+        sender.sequence -= 2
+        sender.send(colors)
+        wait_settled(receiver)
+        ok = receiver.stale == stale + 1 and receiver.latest.colors == colors
+    finally:
+        sender.close()
+        stop()
+
+    if not ok:
+        print("FAIL: stale frame accepted or colors corrupted")
+        sys.exit(1)
+    print("OK")
+
+
+class LedListener:
+    """Local stand-in for a WLED controller that checks and reassembles frames"""
+
+    def __init__(self, protocol, pixels, universe=1):
+        self.protocol = protocol
+        self.universe = universe
+        self.universes = -(-pixels * 3 // E131_MAX_SLOTS)
+        self.strip = bytearray(pixels * 3)
+        self.frame = bytes(self.strip)
+        self.packets = 0
+        self.frames = 0
+        self.malformed = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 2**20)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _decode_ddp(self, packet):
+        flags, sequence, kind, _, offset, length = DDP_HEADER.unpack_from(packet)
+        if flags & 0xC0 != DDP_VERSION or kind != DDP_TYPE_RGB24 or not sequence:
+            return None
+        if len(packet) != DDP_HEADER.size + length:
+            return None
+        return offset, packet[DDP_HEADER.size :], bool(flags & DDP_PUSH)
+
+    def _decode_e131(self, packet):
+        size = len(packet)
+        root_length, root_vector = struct.unpack_from("!HI", packet, 16)
+        frame_length, frame_vector = struct.unpack_from("!HI", packet, 38)
+        (universe,) = struct.unpack_from("!H", packet, 113)
+        dmp_length, vector, kind, _, _, count, start = struct.unpack_from(
+            "!HBBHHHB", packet, 115
+        )
+        valid = (
+            packet[4:16] == ACN_PACKET_ID
+            and root_length == 0x7000 | (size - 16)
+            and frame_length == 0x7000 | (size - 38)
+            and dmp_length == 0x7000 | (size - 115)
+            and (root_vector, frame_vector, vector, kind, start) == (4, 2, 2, 0xA1, 0)
+            and count == size - E131_HEADER_SIZE + 1
+        )
+        index = universe - self.universe
+        if not valid or not 0 <= index < self.universes:
+            return None
+        last = index == self.universes - 1
+        return index * E131_MAX_SLOTS, packet[E131_HEADER_SIZE:], last
+
+    def _run(self):
+        decode = self._decode_ddp if self.protocol == "ddp" else self._decode_e131
+        while self.running:
+            try:
+                packet = self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            decoded = decode(packet)
+            if decoded is None:
+                self.malformed += 1
+                continue
+            offset, data, last = decoded
+            self.strip[offset : offset + len(data)] = data
+            if last:
+                self.frame = bytes(self.strip)
+                self.frames += 1
+
+    def close(self):
+        self.running = False
+        self._thread.join()
+        self.sock.close()
+
+
+def bench_led(args):
+    """
+    DDP / E1.31 output throughput against a local listener
+
+    The listener validates every header and reassembles the strip, so the
+    last frame it completes must match the sender's pixel buffer exactly.
+    """
+    listener = LedListener(args.protocol, args.pixels)
+    if args.protocol == "ddp":
+        output = DDPOutput("127.0.0.1", args.pixels, listener.port)
+    else:
+        output = E131Output("127.0.0.1", args.pixels, 1, listener.port)
+    rng = np.random.default_rng(0)
+    frames = [
+        [tuple(color) for color in rng.integers(0, 256, (args.zones, 3)).tolist()]
+        for _ in range(64)
+    ]
+    print(
+        f"{args.protocol.upper()} on localhost, {args.pixels} pixels in "
+        f"{len(output.packet_views)} packet(s) per frame, {args.zones} zones"
+    )
+
+    try:
+        output.send(frames[0])
+        # The listener thread allocates too, so only count ledstream's lines
+        only_output = [tracemalloc.Filter(True, ledstream.__file__)]
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot().filter_traces(only_output)
+        start = time.perf_counter()
+        for i in range(args.frames):
+            output.send(frames[i % len(frames)])
+        elapsed = time.perf_counter() - start
+        after = tracemalloc.take_snapshot().filter_traces(only_output)
+        tracemalloc.stop()
+        growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        count = -1
+        while count != listener.packets:
+            count = listener.packets
+            time.sleep(0.3)
+        expected = bytes(output.pixel_bytes)
+        received = listener.frame
+    finally:
+        output.close()
+        listener.close()
+
+    sent = args.frames + 1
+    print(f"  send cost       {elapsed / args.frames * 1e6:8.2f} us/frame")
+    print(
+        f"  throughput      {args.frames / elapsed:8.0f} frames/s, "
+        f"{args.frames * len(output.packet_views) / elapsed:8.0f} packets/s, "
+        f"{args.frames * args.pixels / elapsed / 1e6:6.2f} Mpixels/s"
+    )
+    print(
+        f"  received        {listener.frames:8d} frames "
+        f"({sent - listener.frames} incomplete, {output.dropped} packets dropped, "
+        f"{listener.malformed} malformed)"
+    )
+    print(f"  retained        {growth:8d} bytes over {args.frames} frames")
+
+    failures = []
+    if listener.malformed:
+        failures.append(f"{listener.malformed} malformed packets")
+    if received != expected:
+        failures.append("last frame does not match the sent pixels")
+    if growth > args.limit:
+        failures.append(f"sending retained {growth} bytes")
+    if args.frames / elapsed < args.min_rate:
+        failures.append(f"below {args.min_rate:.0f} frames/s")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Color pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    algorithms = sub.add_parser("algorithms", help="mean vs histogram color")
+    algorithms.add_argument("--size", type=parse_size, default=(1920, 1080))
+    algorithms.add_argument("--frames", type=int, default=200)
+    algorithms.set_defaults(func=bench_algorithms)
+
+    kernel = sub.add_parser("kernel", help="JIT kernel equivalence and speed")
+    kernel.add_argument("--size", type=parse_size, default=(1920, 1080))
+    kernel.add_argument("--frames", type=int, default=200)
+    kernel.set_defaults(func=bench_kernel)
+
+    allocations = sub.add_parser("allocations", help="per-frame allocation check")
+    allocations.add_argument("--size", type=parse_size, default=(1920, 1080))
+    allocations.add_argument("--frames", type=int, default=200)
+    allocations.add_argument("--limit", type=int, default=4096)
+    allocations.set_defaults(func=bench_allocations)
+
+    engine = sub.add_parser("engine", help="end-to-end against simulated bulbs")
+    engine.add_argument("--bulbs", type=int, default=1)
+    engine.add_argument("--seconds", type=float, default=10)
+    engine.add_argument("--delay", type=float, default=None)
+    engine.add_argument("--latency", type=float, default=0.02)
+    engine.add_argument("--jitter", type=float, default=0.005)
+    engine.add_argument("--drop", type=float, default=0.0)
+    engine.set_defaults(func=bench_engine)
+
+    edges = sub.add_parser("edges", help="full-frame vs edge-strip capture")
+    edges.add_argument("--size", type=parse_size, default=(1920, 1080))
+    edges.add_argument("--frames", type=int, default=200)
+    edges.set_defaults(func=bench_edges)
+
+    tiles = sub.add_parser("tiles", help="sparse tiles vs full grab")
+    tiles.add_argument("--size", type=parse_size, default=(1920, 1080))
+    tiles.add_argument("--frames", type=int, default=100)
+    tiles.set_defaults(func=bench_tiles)
+
+    damage = sub.add_parser("xdamage", help="damage-driven incremental capture")
+    damage.add_argument("--size", type=parse_size, default=(1920, 1080))
+    damage.add_argument("--frames", type=int, default=200)
+    damage.add_argument("--area", type=float, default=0.1)
+    damage.add_argument("--live", action="store_true", help="use the X server")
+    damage.set_defaults(func=bench_xdamage)
+
+    adaptive = sub.add_parser("downsample", help="frame-budget adaptive factor")
+    adaptive.add_argument("--budget", type=float, default=8.0)
+    adaptive.add_argument("--seconds", type=float, default=3.0)
+    adaptive.set_defaults(func=bench_downsample)
+
+    cuts = sub.add_parser("scenecut", help="scene-cut detection accuracy")
+    cuts.add_argument("--size", type=parse_size, default=(1920, 1080))
+    cuts.add_argument("--frames", type=int, default=600)
+    cuts.add_argument("--scene", type=int, default=48)
+    cuts.set_defaults(func=bench_scenecut)
+
+    stream = sub.add_parser("stream", help="networked color stream on localhost")
+    stream.add_argument("--transport", choices=("udp", "tcp"), default="udp")
+    stream.add_argument("--port", type=int, default=38801)
+    stream.add_argument("--frames", type=int, default=20000)
+    stream.add_argument("--zones", type=int, default=26)
+    stream.add_argument("--rate", type=float, default=500)
+    stream.set_defaults(func=bench_stream)
+
+    led = sub.add_parser("led", help="DDP / E1.31 LED output on localhost")
+    led.add_argument("--protocol", choices=("ddp", "e131"), default="ddp")
+    led.add_argument("--pixels", type=int, default=1000)
+    led.add_argument("--zones", type=int, default=26)
+    led.add_argument("--frames", type=int, default=5000)
+    led.add_argument("--limit", type=int, default=4096, help="bytes allocated")
+    led.add_argument("--min-rate", type=float, default=60.0, help="frames/s")
+    led.set_defaults(func=bench_led)
+
+    window = sub.add_parser("window", help="window capture target (needs X11)")
+    window.add_argument("--frames", type=int, default=100)
+    window.set_defaults(func=bench_window)
+
+    args = parser.parse_args()
+    if hasattr(args, "size"):
+        args.width, args.height = args.size
+
+    load_config()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,20 @@
 from kasa import Discover
 from kasa.iot import IotBulb
 
+BROADCAST_TARGET = "255.255.255.255"
 
-async def discover():
-    bulbs = await Discover.discover()
+
+async def discover(target=BROADCAST_TARGET):
+    bulbs = await Discover.discover(target=target)
     print(f"Found {len(bulbs)} bulbs")
     if not bulbs:
         raise Exception("No bulbs found")
     return list(bulbs.values())[0].host
 
 
-async def discover_bulb():
+async def discover_bulb(target=BROADCAST_TARGET):
     try:
-        ip = await discover()
+        ip = await discover(target)
         print(f"Connected to bulb at {ip}")
         bulb = IotBulb(ip)
         await bulb.update()
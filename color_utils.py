@@ -1,110 +1,179 @@
 import colorsys
+import time
+from functools import lru_cache
 import numpy as np
 from config import get_config
-
-
-def get_average_color_fast(sct, monitor_index):
+from autocrop import get_content_rect
+from kernels import kernel_enabled, weighted_mean_color_jit
+from workspace import get_workspace
+from tiles import grab_tiles
+from topology import current_topology, monitor_rect
+from downsample import get_downsample, record_frame
+from scenecut import observe_frame
+from xwindow import get_window_rect
+from preview import publish_frame
+
+# 2**(3*6) bins; finer histograms cost more per frame than they resolve
+MAX_HISTOGRAM_BITS = 6
+
+
+def get_capture_region(monitor, crop):
+    """Get the cropped capture rectangle for a monitor"""
+    w, h = monitor["width"], monitor["height"]
+    return {
+        "left": int(monitor["left"] + w * crop),
+        "top": int(monitor["top"] + h * crop),
+        "width": int(w * (1 - 2 * crop)),
+        "height": int(h * (1 - 2 * crop)),
+    }
+
+
+def get_active_region(sct, monitor_index, config):
+    """Capture rectangle after auto-crop and crop_percent"""
+    crop = config["capture"]["crop_percent"]
+    window = get_window_rect(config)
+    if window is not None:
+        if config["capture"].get("auto_crop", 0):
+            window = get_content_rect(sct, window, config)
+        return get_capture_region(window, crop)
+
+    topology = current_topology()
+    if topology is not None and not config["capture"].get("auto_crop", 0):
+        return topology.cached(
+            ("capture_region", monitor_index, crop),
+            lambda: get_capture_region(topology.monitor(monitor_index), crop),
+        )
+
+    monitor = get_content_rect(sct, monitor_rect(sct, monitor_index), config)
+    return get_capture_region(monitor, crop)
+
+
+def grab_frame(sct, monitor_index, config=None, capture_region=None):
+    """
+    Grab the cropped, downsampled capture region as a BGRA uint8 array,
+    or a stack of sparse tiles from it in tiles mode
+    """
+    config = config or get_config()
+    if capture_region is None:
+        capture_region = get_active_region(sct, monitor_index, config)
+
+    if config["capture"].get("mode", "full") == "tiles":
+        return grab_tiles(sct, capture_region, config)
+
+    screenshot = sct.grab(capture_region)
+    frame = np.asarray(screenshot)
+
+    downsample = get_downsample(config)
+    if downsample > 1:
+        frame = frame[::downsample, ::downsample, :]
+    return frame
+
+
+def compute_color(frame, config=None):
+    """Reduce a BGRA frame to a single RGB color using the configured algorithm"""
+    config = config or get_config()
+    algorithm = config["capture"].get("algorithm", "mean")
+
+    if algorithm == "histogram":
+        return dominant_color_histogram(frame, config)
+    if kernel_enabled(config):
+        return weighted_mean_color_jit(frame, config)
+    return weighted_mean_color(frame, config)
+
+
+def get_average_color_fast(sct, monitor_index, config=None):
     """Optimized color calculation with MSS and reduced operations"""
-    config = get_config()
-
     try:
-        monitor = sct.monitors[monitor_index]
-        crop = config["capture"]["crop_percent"]
-        w, h = monitor["width"], monitor["height"]
-
-        capture_region = {
-            "left": int(monitor["left"] + w * crop),
-            "top": int(monitor["top"] + h * crop),
-            "width": int(w * (1 - 2 * crop)),
-            "height": int(h * (1 - 2 * crop)),
-        }
-
-        screenshot = sct.grab(capture_region)
-        arr = np.array(screenshot, dtype=np.float32)[:, :, :3]
-        arr = arr[:, :, ::-1]
-
-        downsample = config["capture"].get("downsample", 4)
-        if downsample > 1:
-            arr = arr[::downsample, ::downsample, :]
-
-        boosts = config["color_boosts"]
-        arr[:, :, 0] *= boosts["red"]
-        arr[:, :, 1] *= boosts["green"]
-        arr[:, :, 2] *= boosts["blue"]
-        arr = np.clip(arr, 0, 255)
-
-        arr_norm = arr / 255.0
-        r, g, b = arr_norm[:, :, 0], arr_norm[:, :, 1], arr_norm[:, :, 2]
-
-        max_rgb = np.maximum(np.maximum(r, g), b)
-        min_rgb = np.minimum(np.minimum(r, g), b)
-        diff = max_rgb - min_rgb
-
-        with np.errstate(divide="ignore", invalid="ignore"):
-            saturation = np.where(max_rgb > 0, diff / max_rgb, 0)
-
-        hue = np.zeros_like(r)
-        mask = diff > 0
-
-        with np.errstate(divide="ignore", invalid="ignore"):
-            r_max = mask & (max_rgb == r)
-            hue[r_max] = (60 * ((g[r_max] - b[r_max]) / diff[r_max]) + 360) % 360
-
-            g_max = mask & (max_rgb == g)
-            hue[g_max] = (60 * ((b[g_max] - r[g_max]) / diff[g_max]) + 120) % 360
-
-            b_max = mask & (max_rgb == b)
-            hue[b_max] = (60 * ((r[b_max] - g[b_max]) / diff[b_max]) + 240) % 360
-
-        hue_config = config["hue_adjustments"]
-
-        if hue_config["yellow_boost"] != 1.0:
-            yellow_mask = (hue >= hue_config["yellow_hue_min"]) & (
-                hue <= hue_config["yellow_hue_max"]
-            )
-            arr[yellow_mask, 0] *= hue_config["yellow_boost"]
-            arr[yellow_mask, 1] *= hue_config["yellow_boost"]
-
-        if hue_config["cyan_boost"] != 1.0:
-            cyan_mask = (hue >= hue_config["cyan_hue_min"]) & (
-                hue <= hue_config["cyan_hue_max"]
-            )
-            arr[cyan_mask, 1] *= hue_config["cyan_boost"]
-            arr[cyan_mask, 2] *= hue_config["cyan_boost"]
-
-        if hue_config["magenta_boost"] != 1.0:
-            magenta_mask = (hue >= hue_config["magenta_hue_min"]) & (
-                hue <= hue_config["magenta_hue_max"]
-            )
-            arr[magenta_mask, 0] *= hue_config["magenta_boost"]
-            arr[magenta_mask, 2] *= hue_config["magenta_boost"]
-
-        arr = np.clip(arr, 0, 255)
-
-        luminance = 0.299 * arr[:, :, 0] + 0.587 * arr[:, :, 1] + 0.114 * arr[:, :, 2]
-        w_config = config["weighting"]
-        brightness_weight = (luminance / 255) ** w_config["brightness_power"]
-        saturation_weight = saturation ** w_config["saturation_power"]
-
-        weight = brightness_weight * saturation_weight * w_config["overall_multiplier"]
-        weight[saturation < w_config["saturation_threshold"]] *= 0.1
-        weight[luminance < w_config["luminance_threshold"]] = 0
-
-        weight_3d = weight[:, :, np.newaxis]
-        weighted = arr * weight_3d
-        total_weight = np.sum(weight_3d)
-
-        if total_weight > 0:
-            avg_color = np.sum(weighted, axis=(0, 1)) / total_weight
-            return tuple(avg_color.astype(int))
-        else:
-            return (0, 0, 0)
-
+        config = config or get_config()
+        start = time.perf_counter()
+        region = get_active_region(sct, monitor_index, config)
+        frame = grab_frame(sct, monitor_index, config, region)
+        grabbed = time.perf_counter()
+        color = compute_color(frame, config)
+        observe_frame(frame, config)
+        publish_frame(frame, config)
+
+        if config["capture"].get("mode", "full") == "full":
+            record_frame(config, region, grabbed - start, time.perf_counter() - grabbed)
+        return color
     except Exception as e:
         print(f"Error: {e}")
         return (0, 0, 0)
 
 
+def weighted_mean_color(frame, config):
+    """Saturation/luminance weighted mean over every pixel of a BGRA frame"""
+    workspace = get_workspace("frame", frame.shape[:2])
+    workspace.load_bgra(frame)
+    arr, weight = workspace.weigh(config)
+
+    total_weight = np.sum(weight)
+
+    if total_weight > 0:
+        for channel in range(3):
+            arr[:, :, channel] *= weight
+        np.sum(arr, axis=(0, 1), out=workspace.sums)
+        return tuple(int(c / total_weight) for c in workspace.sums)
+    else:
+        return (0, 0, 0)
+
+
+def histogram_bits(config):
+    """Bits per channel of the color histogram, clamped to MAX_HISTOGRAM_BITS"""
+    bits = int(config["capture"].get("histogram_bits", 4))
+    return min(max(bits, 1), MAX_HISTOGRAM_BITS)
+
+
+@lru_cache(maxsize=4)
+def _histogram_bin_colors(bits):
+    """RGB center of every histogram bin, shape (2**(3*bits), 3)"""
+    levels = 1 << bits
+    step = 256 // levels
+    centers = np.arange(levels, dtype=np.float32) * step + step / 2
+    r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+    colors = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+    colors.flags.writeable = False
+    return colors
+
+
+def dominant_color_histogram(frame, config):
+    """
+    Pick the dominant color cluster from a quantized 3D color histogram
+
+    Pixels are counted into 2**(3*bits) bins with integer math only; boosts
+    and weighting then run once per bin instead of once per pixel. The
+    result is the weighted mean of the strongest bin and its neighbours, so
+    two strong colors on screen don't average out to a muddy in-between.
+    """
+    bits = histogram_bits(config)
+    shift = 8 - bits
+    levels = 1 << bits
+
+    r = frame[:, :, 2] >> shift
+    g = frame[:, :, 1] >> shift
+    b = frame[:, :, 0] >> shift
+    index = (r.astype(np.uint32) << (2 * bits)) | (g.astype(np.uint32) << bits) | b
+    counts = np.bincount(index.ravel(), minlength=levels**3)
+
+    workspace = get_workspace("histogram", (levels**3,))
+    np.copyto(workspace.rgb, _histogram_bin_colors(bits))
+    colors, weight = workspace.weigh(config)
+    bin_weight = (counts * weight).reshape(levels, levels, levels)
+
+    peak = np.unravel_index(np.argmax(bin_weight), bin_weight.shape)
+    if bin_weight[peak] <= 0:
+        return (0, 0, 0)
+
+    cluster = tuple(slice(max(p - 1, 0), p + 2) for p in peak)
+    cluster_weight = bin_weight[cluster]
+    cluster_colors = colors.reshape(levels, levels, levels, 3)[cluster]
+
+    avg_color = np.tensordot(cluster_weight, cluster_colors, axes=3) / np.sum(
+        cluster_weight
+    )
+    return tuple(avg_color.astype(int))
+
+
 def rgb_to_hsv_vibrant(r, g, b):
     """Fast HSV conversion with gamma correction"""
     config = get_config()
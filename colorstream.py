@@ -0,0 +1,421 @@
+"""
+Networked color stream
+Splits the engine at the color boundary: a capture node sends the color of
+every frame (plus its edge zones, if any) to a controller node that owns
+the bulb. Frames are compact binary packets, as UDP datagrams or
+length-prefixed over TCP, carrying a per-source sequence number and the
+send time, so stale and reordered packets are dropped.
+
+Packet layout (network byte order):
+    magic "BS", version, flags, source id, transition ms, sequence,
+    send time in microseconds since the epoch, then RGB byte triples;
+    the first triple is the bulb color, the rest are zones
+
+Usage:
+    python colorstream.py [--host 0.0.0.0] [--port 38800] [--transport udp]
+"""
+
+import argparse
+import asyncio
+import errno
+import os
+import random
+import select
+import socket
+import struct
+import time
+from collections import deque, namedtuple
+from config import load_config
+from bulb import discover_bulb, BROADCAST_TARGET
+from supervisor import BulbSupervisor
+from color_utils import rgb_to_hsv_vibrant
+
+MAGIC = b"BS"
+VERSION = 1
+FLAG_CUT = 1
+PORT = 38800
+MAX_COLORS = 256
+HEADER = struct.Struct("!2sBBHHIQ")
+TCP_PREFIX = struct.Struct("!H")
+MAX_PACKET = HEADER.size + 3 * MAX_COLORS
+SEND_TIMEOUT = 0.2
+RETRY_INTERVAL = 2.0
+SOURCE_TIMEOUT = 5.0
+STATUS_INTERVAL = 10.0
+
+ColorFrame = namedtuple(
+    "ColorFrame", "source transition_ms sequence timestamp cut colors"
+)
+
+
+def now_us():
+    """Wall-clock microseconds, comparable across NTP-synced machines"""
+    return time.time_ns() // 1000
+
+
+def is_newer(sequence, last):
+    """Sequence comparison that survives the 32-bit wrap-around"""
+    return 0 < (sequence - last) & 0xFFFFFFFF < 0x80000000
+
+
+def decode(packet):
+    """
+    Parse one packet
+
+    Returns:
+        ColorFrame, or None if the packet is malformed
+    """
+    size = len(packet)
+    if size < HEADER.size + 3 or (size - HEADER.size) % 3:
+        return None
+    magic, version, flags, *fields = HEADER.unpack_from(packet)
+    if magic != MAGIC or version != VERSION:
+        return None
+    colors = [tuple(packet[i : i + 3]) for i in range(HEADER.size, size, 3)]
+    return ColorFrame(*fields, bool(flags & FLAG_CUT), colors)
+
+
+class ColorStreamSender:
+    """Capture side: packs frames into one reusable buffer and sends them"""
+
+    def __init__(self, host, port=PORT, transport="udp", source=None):
+        self.address = (host, port)
+        self.transport = transport
+        self.source = source or random.randint(1, 0xFFFF)
+        self.sequence = 0
+        self.buffer = bytearray(TCP_PREFIX.size + MAX_PACKET)
+        self.view = memoryview(self.buffer)
+        self.sock = None
+        self.connecting = False
+        self.connect_deadline = 0.0
+        self.retry_at = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def _connect(self):
+        if self.transport == "tcp":
+            # Connect in the background, a blocking connect would stall capture
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            error = sock.connect_ex(self.address)
+            if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                sock.close()
+                raise OSError(error, os.strerror(error))
+            self.connecting = True
+            self.connect_deadline = time.monotonic() + RETRY_INTERVAL
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.connect(self.address)
+            sock.setblocking(False)
+        return sock
+
+    def _connected(self):
+        """
+        Check on a pending TCP connect without blocking
+
+        Returns:
+            True once connected, False while still connecting; raises
+            OSError if the connect failed or timed out
+        """
+        _, writable, _ = select.select([], [self.sock], [], 0)
+        if not writable:
+            if time.monotonic() > self.connect_deadline:
+                raise TimeoutError("connect timed out")
+            return False
+        error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            raise OSError(error, os.strerror(error))
+        # Sends block briefly again, so a frame is never half written
+        self.sock.settimeout(SEND_TIMEOUT)
+        self.connecting = False
+        return True
+
+    def _unreachable(self, error):
+        print(f"Color stream: cannot reach {self.address}: {error}")
+        self.close()
+        self.retry_at = time.monotonic() + RETRY_INTERVAL
+        self.dropped += 1
+
+    def send(self, colors, transition_ms=0, cut=False):
+        """
+        Send one frame without waiting for the controller
+
+        Args:
+            colors: RGB tuples, the bulb color first, then any zones
+            transition_ms: Transition the controller should use
+            cut: Whether the frame starts a new scene
+
+        Returns:
+            True if the frame was handed to the network
+        """
+        if self.sock is None:
+            if time.monotonic() < self.retry_at:
+                self.dropped += 1
+                return False
+            try:
+                self.sock = self._connect()
+            except OSError as e:
+                self._unreachable(e)
+                return False
+        if self.connecting:
+            try:
+                connected = self._connected()
+            except OSError as e:
+                self._unreachable(e)
+                return False
+            if not connected:
+                self.dropped += 1
+                return False
+
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        count = min(len(colors), MAX_COLORS)
+        offset = TCP_PREFIX.size
+        HEADER.pack_into(
+            self.buffer,
+            offset,
+            MAGIC,
+            VERSION,
+            FLAG_CUT if cut else 0,
+            self.source,
+            min(max(int(transition_ms), 0), 0xFFFF),
+            self.sequence,
+            now_us(),
+        )
+        position = offset + HEADER.size
+        for color in colors[:count]:
+            for channel in color:
+                self.buffer[position] = min(max(int(channel), 0), 255)
+                position += 1
+
+        try:
+            if self.transport == "tcp":
+                TCP_PREFIX.pack_into(self.buffer, 0, position - offset)
+                self.sock.sendall(self.view[:position])
+            else:
+                self.sock.send(self.view[offset:position])
+        except BlockingIOError:
+            # Socket buffer full: drop the frame, a newer one follows shortly
+            self.dropped += 1
+            return False
+        except OSError as e:
+            print(f"Color stream send failed: {e}")
+            self.close()
+            self.retry_at = time.monotonic() + RETRY_INTERVAL
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.connecting = False
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver.feed(data)
+
+
+class ColorStreamReceiver:
+    """
+    Controller side: keeps the newest frame and drops stale packets
+
+    Follows one capture node at a time, so two senders cannot interleave;
+    another one takes over once the active one has been quiet for
+    SOURCE_TIMEOUT.
+    """
+
+    def __init__(self):
+        self.sequences = {}
+        self.source = None
+        self.latest = None
+        self.received = 0
+        self.stale = 0
+        self.ignored = 0
+        self.malformed = 0
+        self.latency = deque(maxlen=1000)
+        self._ready = asyncio.Event()
+
+    def feed(self, packet):
+        """Handle one packet from any transport"""
+        frame = decode(packet)
+        if frame is None:
+            self.malformed += 1
+            return
+
+        now = time.monotonic()
+        active = self.sequences.get(self.source)
+        if (
+            frame.source != self.source
+            and active is not None
+            and now - active[1] < SOURCE_TIMEOUT
+        ):
+            self.ignored += 1
+            return
+
+        last = self.sequences.get(frame.source)
+        # A source that went quiet may have restarted its sequence
+        if (
+            last is not None
+            and now - last[1] < SOURCE_TIMEOUT
+            and not is_newer(frame.sequence, last[0])
+        ):
+            self.stale += 1
+            return
+
+        if frame.source != self.source:
+            print(f"Color stream: following source {frame.source}")
+            self.source = frame.source
+        self.sequences[frame.source] = (frame.sequence, now)
+        self.received += 1
+        self.latency.append((now_us() - frame.timestamp) / 1000)
+        self.latest = frame
+        self._ready.set()
+
+    async def wait(self, timeout=None):
+        """
+        Wait for a frame newer than the last one taken
+
+        Returns:
+            The newest frame, or None on timeout
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        return self.latest
+
+    async def serve(self, host="0.0.0.0", port=PORT, transport="udp"):
+        """
+        Start listening
+
+        Returns:
+            The datagram transport or TCP server, to close when done
+        """
+        loop = asyncio.get_running_loop()
+        if transport == "tcp":
+            return await asyncio.start_server(self._handle_tcp, host, port)
+        endpoint, _ = await loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), local_addr=(host, port)
+        )
+        return endpoint
+
+    async def _handle_tcp(self, reader, writer):
+        try:
+            while True:
+                (size,) = TCP_PREFIX.unpack(await reader.readexactly(TCP_PREFIX.size))
+                self.feed(await reader.readexactly(size))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def status(self):
+        """One-line summary, e.g. for the controller log"""
+        samples = sorted(self.latency)
+        latency = f"{samples[len(samples) // 2]:.2f} ms" if samples else "-"
+        return (
+            f"{self.received} frames from source {self.source}, "
+            f"{self.ignored} from other sources, "
+            f"{self.stale} stale, {self.malformed} malformed, "
+            f"network p50 {latency}"
+        )
+
+
+def open_sender(config):
+    """A sender if this node is configured as a capture node, else None"""
+    stream = config.get("stream", {})
+    if stream.get("role", "off") != "capture":
+        return None
+    sender = ColorStreamSender(
+        stream.get("host", "127.0.0.1"),
+        stream.get("port", PORT),
+        stream.get("transport", "udp"),
+        stream.get("source") or None,
+    )
+    print(
+        f"Streaming colors to {stream.get('host', '127.0.0.1')}:"
+        f"{sender.address[1]} over {sender.transport.upper()}"
+    )
+    return sender
+
+
+async def drive_supervisor(receiver, supervisor, config):
+    """
+    Forward received frames to the bulb, always sending the newest one
+
+    Frames arriving while the bulb is rate limited replace each other;
+    a scene cut is sent right away.
+    """
+    rate = supervisor.rate
+    last_status = time.monotonic()
+    while True:
+        frame = await receiver.wait(STATUS_INTERVAL)
+        if time.monotonic() - last_status >= STATUS_INTERVAL:
+            last_status = time.monotonic()
+            print(f"Color stream: {receiver.status()}")
+        if frame is None:
+            continue
+
+        if not supervisor.online:
+            await supervisor.wait_connected(
+                timeout=config["capture"].get("offline_delay", 0.5)
+            )
+            continue
+
+        transition_ms = frame.transition_ms
+        if config["capture"].get("adaptive_rate", 1):
+            rate.set_max_rate(1 / max(config["capture"]["update_delay"], 0.001))
+            while not frame.cut and rate.delay() > 0:
+                frame = await receiver.wait(rate.delay()) or frame
+            if not frame.cut:
+                transition_ms = rate.transition_ms(frame.transition_ms)
+
+        h, s, v = rgb_to_hsv_vibrant(*frame.colors[0])
+        await supervisor.set_hsv(h, s, v, transition_ms)
+
+
+async def run_controller(config, host="0.0.0.0", port=PORT, transport="udp"):
+    """Controller node: receive the color stream and drive the bulb"""
+    target = config.get("bulb", {}).get("discovery_target", BROADCAST_TARGET)
+    supervisor = BulbSupervisor(lambda: discover_bulb(target))
+    supervisor_task = asyncio.create_task(supervisor.run())
+
+    receiver = ColorStreamReceiver()
+    server = await receiver.serve(host, port, transport)
+    print(f"Listening for colors on {host}:{port} over {transport.upper()}")
+    try:
+        await drive_supervisor(receiver, supervisor, config)
+    finally:
+        server.close()
+        supervisor_task.cancel()
+
+
+def main():
+    config = load_config()
+    stream = config.get("stream", {})
+    parser = argparse.ArgumentParser(description="Color stream controller node")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=stream.get("port", PORT))
+    parser.add_argument(
+        "--transport",
+        choices=("udp", "tcp"),
+        default=stream.get("transport", "udp"),
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_controller(config, args.host, args.port, args.transport))
+    except KeyboardInterrupt:
+        print("\n👋 Bye!")
+
+
+if __name__ == "__main__":
+    main()
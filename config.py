@@ -4,6 +4,21 @@ import os
 CONFIG_FILE = "bulb_config.json"
 
 config = {}
+_active_config = None
+_listeners = []
+
+
+def add_config_listener(callback):
+    """Call callback(config) after the config is loaded, reloaded or saved"""
+    _listeners.append(callback)
+
+
+def _notify():
+    for callback in _listeners:
+        try:
+            callback(config)
+        except Exception as e:
+            print(f"Error in config listener: {e}")
 
 
 def load_config():
@@ -22,6 +37,7 @@ def load_config():
         config.update(loaded_config)
 
         print(f"Loaded config from {CONFIG_FILE}")
+        _notify()
         return config
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in config file: {e}")
@@ -34,6 +50,7 @@ def save_config():
     try:
         with open(CONFIG_FILE, "w") as f:
             json.dump(config, f, indent=4)
+        _notify()
         return True
     except Exception as e:
         print(f"Error saving config: {e}")
@@ -50,6 +67,7 @@ def reload_config():
         if new_config != config:
             config.clear()
             config.update(new_config)
+            _notify()
             return True
     except json.JSONDecodeError as e:
         print(f"Invalid JSON in config file: {e}")
@@ -58,6 +76,14 @@ def reload_config():
     return False
 
 
+def set_active_config(active):
+    """Make get_config() return a prepared config, or the base one for None"""
+    global _active_config
+    _active_config = active
+
+
 def get_config():
-    """Get current config dictionary"""
-    return config
+    """Get current config dictionary (the active profile's, if one is set)"""
+    if _active_config is None:
+        return config
+    return _active_config
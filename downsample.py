@@ -0,0 +1,175 @@
+"""
+Frame-budget adaptive downsampling
+With capture.downsample set to "auto", the subsampling factor is picked at
+runtime: the finest factor whose predicted processing time fits what the
+grab leaves of capture.frame_budget_ms. The grab itself does not get
+cheaper with coarser sampling, so it is never traded against the factor.
+The cost model is refreshed from every measured frame, so it follows
+resolution changes and CPU load.
+"""
+
+import time
+
+FACTORS = (1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+DEFAULT_BUDGET_MS = 8.0
+SMOOTHING = 0.2
+HEADROOM = 0.8
+MIN_PROCESS_SHARE = 0.5
+MIN_SWITCH_INTERVAL = 0.5
+COST_EXPIRY = 30.0
+
+
+def sample_count(factor, width, height):
+    """Pixels left after subsampling a width x height region by factor"""
+    return len(range(0, height, factor)) * len(range(0, width, factor))
+
+
+class DownsampleController:
+    """Learns the pipeline cost per factor and picks one that fits the budget"""
+
+    def __init__(self, initial=8):
+        self.factor = initial
+        self.geometry = None
+        self.grab_time = None
+        self.costs = {}
+        self.estimate = 0.0
+        self.last_switch = 0.0
+        self.warmup = True
+
+    def reset(self, geometry):
+        """Start over for a new capture size"""
+        self.geometry = geometry
+        self.grab_time = None
+        self.costs = {}
+        self.warmup = True
+
+    def record(self, width, height, grab_seconds, process_seconds):
+        """
+        Feed the timings of one frame captured at the current factor
+
+        Args:
+            width, height: Capture region size in pixels
+            grab_seconds: Time spent grabbing the region
+            process_seconds: Time spent in the color pipeline
+        """
+        if (width, height) != self.geometry:
+            self.reset((width, height))
+
+        # The first frame at a new size or factor pays for buffer allocation
+        self.estimate = grab_seconds + process_seconds
+        if self.warmup:
+            self.warmup = False
+            return
+
+        now = time.monotonic()
+        if self.grab_time is None:
+            self.grab_time = grab_seconds
+        else:
+            self.grab_time += SMOOTHING * (grab_seconds - self.grab_time)
+
+        cost = self.costs.get(self.factor, (process_seconds, now))[0]
+        cost += SMOOTHING * (process_seconds - cost)
+        self.costs[self.factor] = (cost, now)
+
+        # Costs measured long ago no longer reflect the current load
+        for factor, (_, measured) in list(self.costs.items()):
+            if now - measured > COST_EXPIRY:
+                del self.costs[factor]
+
+    def model(self):
+        """
+        Fit process time = overhead + per_sample * samples to the measured
+        factors; with a single factor the overhead is assumed to be zero
+        """
+        width, height = self.geometry
+        points = [
+            (sample_count(factor, width, height), cost)
+            for factor, (cost, _) in self.costs.items()
+        ]
+        if len(points) == 1:
+            samples, cost = points[0]
+            return 0.0, cost / samples
+
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        var = sum((x - mean_x) ** 2 for x, _ in points)
+        cov = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        per_sample = max(cov / var, 0.0) if var else 0.0
+        return max(mean_y - per_sample * mean_x, 0.0), per_sample
+
+    def predict(self, factor):
+        """Predicted processing seconds per frame at a factor, without the grab"""
+        width, height = self.geometry
+        overhead, per_sample = self.model()
+        return overhead + per_sample * sample_count(factor, width, height)
+
+    def process_budget(self, budget):
+        """
+        Part of the frame budget left for processing; when the grab alone
+        takes most of it, processing still gets MIN_PROCESS_SHARE instead
+        of being pushed to the coarsest factor for no gain
+        """
+        return max(budget - self.grab_time, budget * MIN_PROCESS_SHARE)
+
+    def choose(self, budget):
+        """
+        Pick the factor for the next frames: coarser right away when over
+        budget, one step finer at a time when there is headroom
+        """
+        if self.factor not in self.costs:
+            return self.factor
+
+        budget = self.process_budget(budget)
+        now = time.monotonic()
+        index = FACTORS.index(self.factor) if self.factor in FACTORS else 0
+        choice = self.factor
+
+        if self.predict(self.factor) > budget:
+            choice = FACTORS[-1]
+            for factor in FACTORS[index + 1 :]:
+                if self.predict(factor) <= budget:
+                    choice = factor
+                    break
+        elif index > 0 and now - self.last_switch >= MIN_SWITCH_INTERVAL:
+            finer = FACTORS[index - 1]
+            # Headroom keeps the choice from flipping around the budget
+            if self.predict(finer) <= budget * HEADROOM:
+                choice = finer
+
+        if choice != self.factor:
+            self.factor = choice
+            self.last_switch = now
+            self.warmup = True
+        return self.factor
+
+
+_controller = DownsampleController()
+
+
+def is_auto(config):
+    return config["capture"].get("downsample", 4) == "auto"
+
+
+def get_downsample(config):
+    """Current subsampling step: the configured integer or the adaptive choice"""
+    value = config["capture"].get("downsample", 4)
+    if value == "auto":
+        return _controller.factor
+    return max(int(value), 1)
+
+
+def record_frame(config, region, grab_seconds, process_seconds):
+    """Update the adaptive factor from one measured full-frame capture"""
+    if not is_auto(config):
+        return
+    width, height = region["width"], region["height"]
+    _controller.record(width, height, grab_seconds, process_seconds)
+    budget = config["capture"].get("frame_budget_ms", DEFAULT_BUDGET_MS) / 1000
+    _controller.choose(budget)
+
+
+def downsample_status(config):
+    """Short description for the debug tab, e.g. "8 (auto, 3.1 ms)" """
+    if not is_auto(config):
+        return str(get_downsample(config))
+    return f"{_controller.factor} (auto, {_controller.estimate * 1000:.1f} ms)"
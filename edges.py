@@ -0,0 +1,163 @@
+"""
+Edge-strip sampling for ambilight-style light strips
+Grabs only thin bands along the screen border and splits them into
+segments that follow the strip's LEDs clockwise from the top-left corner:
+top (left to right), right (top to bottom), bottom (right to left),
+left (bottom to top)
+"""
+
+import numpy as np
+from config import get_config
+from autocrop import get_content_rect
+from workspace import get_workspace
+from topology import monitor_rect
+from downsample import get_downsample
+
+
+class EdgeLayout:
+    """Band rectangles and per-pixel segment labels for one geometry"""
+
+    def __init__(self, rect, depth, segments_x, segments_y, downsample):
+        w, h = rect["width"], rect["height"]
+        band = max(int(min(w, h) * depth), 1)
+        step = max(downsample, 1)
+
+        self.key = (
+            rect["left"],
+            rect["top"],
+            w,
+            h,
+            depth,
+            segments_x,
+            segments_y,
+            downsample,
+        )
+        self.segment_count = 2 * (segments_x + segments_y)
+
+        # (region, segments, offset, axis, reversed)
+        bands = [
+            ((rect["left"], rect["top"], w, band), segments_x, 0, 1, False),
+            (
+                (rect["left"] + w - band, rect["top"] + band, band, h - 2 * band),
+                segments_y,
+                segments_x,
+                0,
+                False,
+            ),
+            (
+                (rect["left"], rect["top"] + h - band, w, band),
+                segments_x,
+                segments_x + segments_y,
+                1,
+                True,
+            ),
+            (
+                (rect["left"], rect["top"] + band, band, h - 2 * band),
+                segments_y,
+                2 * segments_x + segments_y,
+                0,
+                True,
+            ),
+        ]
+
+        self.regions = []
+        self.slices = []
+        labels = []
+        start = 0
+        for (left, top, bw, bh), count, offset, axis, reverse in bands:
+            rows = len(range(0, bh, step))
+            cols = len(range(0, bw, step))
+            length = cols if axis == 1 else rows
+
+            position = np.arange(length) * count // length
+            if reverse:
+                position = count - 1 - position
+            if axis == 1:
+                band_labels = np.broadcast_to(position, (rows, cols))
+            else:
+                band_labels = np.broadcast_to(position[:, np.newaxis], (rows, cols))
+
+            self.regions.append({"left": left, "top": top, "width": bw, "height": bh})
+            self.slices.append((slice(start, start + rows * cols), (rows, cols)))
+            labels.append(band_labels.ravel() + offset)
+            start += rows * cols
+
+        self.labels = np.concatenate(labels).astype(np.intp)
+        self.pixels = np.empty((start, 4), dtype=np.uint8)
+
+
+_layout = None
+
+
+def get_layout(rect, config):
+    """Get the cached edge layout, rebuilding it only when geometry changes"""
+    global _layout
+    capture = config["capture"]
+    args = (
+        rect,
+        capture.get("edge_depth", 0.03),
+        capture.get("edge_segments_x", 8),
+        capture.get("edge_segments_y", 5),
+        get_downsample(config),
+    )
+    key = (rect["left"], rect["top"], rect["width"], rect["height"]) + args[1:]
+    if _layout is None or _layout.key != key:
+        _layout = EdgeLayout(*args)
+    return _layout
+
+
+def grab_edges(sct, layout, downsample):
+    """Grab the four border bands into the layout's pixel buffer"""
+    step = max(downsample, 1)
+    for region, (pixels, shape) in zip(layout.regions, layout.slices):
+        band = np.asarray(sct.grab(region))[::step, ::step, :]
+        layout.pixels[pixels].reshape(shape + (4,))[...] = band
+    return layout.pixels
+
+
+def segment_colors(pixels, labels, segment_count, config):
+    """
+    Weighted mean color of every segment in one vectorized pass
+
+    Returns:
+        Tuple of (overall RGB, list of per-segment RGB tuples)
+    """
+    workspace = get_workspace("edges", pixels.shape[:1])
+    workspace.load_bgra(pixels)
+    rgb, weight = workspace.weigh(config)
+
+    totals = np.bincount(labels, weights=weight, minlength=segment_count)
+    sums = np.empty((segment_count, 3))
+    for channel in range(3):
+        np.multiply(rgb[:, channel], weight, out=workspace.tmp)
+        sums[:, channel] = np.bincount(
+            labels, weights=workspace.tmp, minlength=segment_count
+        )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        segments = np.where(totals[:, np.newaxis] > 0, sums / totals[:, np.newaxis], 0)
+
+    total_weight = totals.sum()
+    if total_weight > 0:
+        overall = tuple(int(c) for c in sums.sum(axis=0) / total_weight)
+    else:
+        overall = (0, 0, 0)
+    return overall, [tuple(int(c) for c in seg) for seg in segments]
+
+
+def get_edge_colors(sct, monitor_index, config=None):
+    """
+    Capture only the screen border and compute per-segment colors
+
+    Returns:
+        Tuple of (overall RGB, list of per-segment RGB tuples)
+    """
+    config = config or get_config()
+    try:
+        rect = get_content_rect(sct, monitor_rect(sct, monitor_index), config)
+        layout = get_layout(rect, config)
+        pixels = grab_edges(sct, layout, get_downsample(config))
+        return segment_colors(pixels, layout.labels, layout.segment_count, config)
+    except Exception as e:
+        print(f"Error: {e}")
+        return (0, 0, 0), []
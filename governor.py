@@ -0,0 +1,210 @@
+"""
+CPU and power governor
+Measures the process's own CPU time once a second and steps through
+cheaper settings (longer update delay, coarser subsampling) until it fits
+the configured CPU budget. On battery or when a
+thermal zone runs hot a stricter budget applies. Power and temperature are
+read from /sys on Linux and GetSystemPowerStatus on Windows.
+"""
+
+import glob
+import platform
+import time
+from config import add_config_listener
+from profiles import merge, prepare
+from downsample import FACTORS
+
+IS_WINDOWS = platform.system() == "Windows"
+
+# (update delay scale, downsample scale) per level. The algorithm is left
+# alone: which one is cheaper depends on whether the numba kernel is in use
+LEVELS = (
+    (1.0, 1),
+    (1.5, 2),
+    (2.0, 4),
+    (4.0, 8),
+)
+INTERVAL = 1.0
+HEADROOM = 0.6
+RELAX_AFTER = 5.0
+DEFAULTS = {
+    "enabled": 1,
+    "cpu_budget": 25.0,
+    "battery_budget": 10.0,
+    "hot_budget": 10.0,
+    "hot_temp": 80.0,
+}
+
+
+def _on_battery_windows():
+    import ctypes
+
+    class SYSTEM_POWER_STATUS(ctypes.Structure):
+        _fields_ = [
+            ("ACLineStatus", ctypes.c_ubyte),
+            ("BatteryFlag", ctypes.c_ubyte),
+            ("BatteryLifePercent", ctypes.c_ubyte),
+            ("SystemStatusFlag", ctypes.c_ubyte),
+            ("BatteryLifeTime", ctypes.c_ulong),
+            ("BatteryFullLifeTime", ctypes.c_ulong),
+        ]
+
+    status = SYSTEM_POWER_STATUS()
+    if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+        return False
+    return status.ACLineStatus == 0
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def on_battery():
+    """Whether the machine is running on battery power"""
+    if IS_WINDOWS:
+        try:
+            return _on_battery_windows()
+        except Exception:
+            return False
+
+    mains = []
+    discharging = False
+    for supply in glob.glob("/sys/class/power_supply/*"):
+        kind = _read(f"{supply}/type")
+        if kind == "Mains":
+            mains.append(_read(f"{supply}/online") == "1")
+        elif kind == "Battery":
+            discharging |= _read(f"{supply}/status") == "Discharging"
+    if mains:
+        return not any(mains)
+    return discharging
+
+
+def max_temperature():
+    """Hottest thermal zone in degrees Celsius, or None if unknown"""
+    temps = []
+    for zone in glob.glob("/sys/class/thermal/thermal_zone*/temp"):
+        value = _read(zone)
+        if value and value.lstrip("-").isdigit():
+            temps.append(int(value) / 1000)
+    return max(temps) if temps else None
+
+
+class PowerGovernor:
+    """Picks a cost level from measured CPU use and the power state"""
+
+    def __init__(self):
+        self.level = 0
+        self.cpu = 0.0
+        self.budget = DEFAULTS["cpu_budget"]
+        self.battery = False
+        self.temperature = None
+        self.overheated = False
+        self.last_check = time.monotonic()
+        self.last_cpu = time.process_time()
+        self.calm_since = None
+        self._cache = (None, None, None)
+
+    def settings(self, config):
+        return {**DEFAULTS, **config.get("governor", {})}
+
+    def update(self, config):
+        """Measure CPU use and adjust the level, at most once per INTERVAL"""
+        now = time.monotonic()
+        elapsed = now - self.last_check
+        if elapsed < INTERVAL:
+            return
+        cpu_time = time.process_time()
+        self.cpu = (cpu_time - self.last_cpu) / elapsed * 100
+        self.last_check, self.last_cpu = now, cpu_time
+
+        settings = self.settings(config)
+        self.battery = on_battery()
+        self.temperature = max_temperature()
+        self.overheated = (
+            self.temperature is not None and self.temperature >= settings["hot_temp"]
+        )
+        budget = settings["cpu_budget"]
+        if self.battery:
+            budget = min(budget, settings["battery_budget"])
+        if self.overheated:
+            budget = min(budget, settings["hot_budget"])
+        self.budget = budget
+
+        if self.cpu > budget:
+            self.calm_since = None
+            self.level = min(self.level + 1, len(LEVELS) - 1)
+        elif self.cpu < budget * HEADROOM and self.level > 0:
+            # Step back down slowly so the level does not oscillate
+            if self.calm_since is None:
+                self.calm_since = now
+            elif now - self.calm_since >= RELAX_AFTER:
+                self.calm_since = now
+                self.level -= 1
+        else:
+            self.calm_since = None
+
+    def invalidate(self, config=None):
+        """Forget the adjusted config, e.g. after the source was reloaded"""
+        self._cache = (None, None, None)
+
+    def apply(self, config):
+        """
+        Config adjusted for the current level
+
+        The adjusted copy is prepared once and reused until the level or
+        the source config changes, so governed frames do no extra setup.
+        """
+        if self.level == 0:
+            return config
+        source, level, governed = self._cache
+        if source is config and level == self.level:
+            return governed
+
+        delay_scale, downsample_scale = LEVELS[self.level]
+        capture = config["capture"]
+        overrides = {"update_delay": capture["update_delay"] * delay_scale}
+        downsample = capture.get("downsample", 4)
+        if downsample == "auto":
+            budget_ms = capture.get("frame_budget_ms", 8.0)
+            overrides["frame_budget_ms"] = budget_ms / downsample_scale
+        else:
+            factor = max(int(downsample), 1)
+            coarsest = max(factor, FACTORS[-1])
+            overrides["downsample"] = min(factor * downsample_scale, coarsest)
+
+        governed = merge(config, {"capture": overrides})
+        prepare(governed)
+        self._cache = (config, self.level, governed)
+        return governed
+
+    def status(self):
+        """Power mode for the debug tab, e.g. "battery, level 2" """
+        mode = "battery" if self.battery else "AC"
+        if self.overheated:
+            mode += f", hot {self.temperature:.0f}°C"
+        return f"{mode}, level {self.level}"
+
+
+_governor = PowerGovernor()
+add_config_listener(_governor.invalidate)
+
+
+def govern(config):
+    """Update the governor and return the config to use for this frame"""
+    if not _governor.settings(config)["enabled"]:
+        return config
+    _governor.update(config)
+    return _governor.apply(config)
+
+
+def governor_status():
+    """(mode, CPU) strings for the debug tab"""
+    return (
+        _governor.status(),
+        f"{_governor.cpu:.0f}% (budget {_governor.budget:.0f}%)",
+    )
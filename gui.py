@@ -2,16 +2,23 @@ import customtkinter as ctk
 from config import config, save_config, reload_config
 from tkinter import messagebox
 import pystray
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageTk
+import numpy as np
 import threading
 import os
 import platform
+import gc
 from notifications import show_notification
-import mss
 
 from ui import build_settings_tab, build_monitor_tab, build_debug_tab, COLORS
-from icons import Icons
+from icons import Icons, clear_icon_cache
 from identify import identify_monitors
+from tracing import traced, dump_trace
+from profiler import start_profiling
+from procstats import rss_bytes, format_bytes
+from topology import get_topology
+from profiles import get_profiles, switch_profile
+from preview import get_preview, THUMB_WIDTH, THUMB_HEIGHT, RENDER_INTERVAL_MS
 
 IS_WINDOWS = platform.system() == "Windows"
 IS_LINUX = platform.system() == "Linux"
@@ -33,40 +40,53 @@ class ConfigWindow:
         self.monitors_info = []
         self.debug_widgets = {}
         self.tray_icon = None
+        self.main_frame = None
         self.start_minimized = start_minimized
+        self.window_visible = not start_minimized
+        self.preview_image = None
+        self.preview_version = 0
+        self.preview_pixels = np.zeros((THUMB_HEIGHT, THUMB_WIDTH, 3), dtype=np.uint8)
 
         self.root.protocol("WM_DELETE_WINDOW", self._hide_window)
 
         self._create_ui()
         self._create_tray_icon()
 
+        get_topology().subscribe(
+            lambda topology: self.root.after(0, self._on_topology_changed, topology)
+        )
+
         if self.start_minimized:
             self.root.after(100, self._hide_window)
+        self.root.after(RENDER_INTERVAL_MS, self._refresh_preview)
 
     def _get_monitors_info(self):
         """Get information about all available monitors"""
-        try:
-            with mss.mss() as sct:
-                monitors = []
-                for i, monitor in enumerate(sct.monitors[1:], start=1):
-                    monitors.append(
-                        {
-                            "index": i,
-                            "width": monitor["width"],
-                            "height": monitor["height"],
-                            "left": monitor["left"],
-                            "top": monitor["top"],
-                        }
-                    )
-                return monitors
-        except Exception as e:
-            print(f"Error getting monitors: {e}")
-            return []
+        return get_topology().monitors_info()
+
+    def _on_topology_changed(self, topology):
+        """Rebuild the monitor cards after a monitor was plugged or unplugged"""
+        if self.main_frame is None:
+            return
+
+        for child in self.display_tab.winfo_children():
+            child.destroy()
+
+        self.monitors_info = self._get_monitors_info()
+        self.monitor_buttons = build_monitor_tab(
+            self.display_tab,
+            self.monitors_info,
+            config["capture"].get("monitor_index", 1),
+            self._select_monitor,
+            self._identify_monitors,
+        )
+        self._update_debug_info()
 
     def _create_ui(self):
         """Build the configuration interface"""
         main_frame = ctk.CTkFrame(self.root, fg_color="transparent")
         main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        self.main_frame = main_frame
 
         title_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         title_frame.pack(pady=(0, 20))
@@ -161,7 +181,7 @@ class ConfigWindow:
             self._identify_monitors,
         )
 
-        build_settings_tab(self.settings_tab, self.entries)
+        build_settings_tab(self.settings_tab, self.entries, self._active_profile())
         self.debug_widgets = build_debug_tab(self.debug_tab)
 
         self._show_display_tab()
@@ -169,6 +189,23 @@ class ConfigWindow:
         self._create_bottom_buttons(main_frame)
         self._create_startup_options(main_frame)
 
+    def _active_profile(self):
+        """(name, overrides) of the profile the engine runs with, or None"""
+        name = get_profiles().active
+        overrides = config.get("profiles", {}).get(name)
+        if name is None or not isinstance(overrides, dict):
+            return None
+        return name, overrides
+
+    def _rebuild_settings_tab(self):
+        """Rebuild the entries after a reload or profile switch"""
+        if self.settings_tab is None:
+            return
+        for child in self.settings_tab.winfo_children():
+            child.destroy()
+        self.entries.clear()
+        build_settings_tab(self.settings_tab, self.entries, self._active_profile())
+
     def _create_bottom_buttons(self, parent):
         """Create save and reload buttons"""
         btn_frame = ctk.CTkFrame(parent, fg_color="transparent")
@@ -238,6 +275,7 @@ class ConfigWindow:
         )
         minimized_check.pack(side="left", pady=5)
 
+    @traced()
     def _switch_tab(self, tab_id, tab_command):
         """Switch between tabs"""
         self.current_tab = tab_id
@@ -249,6 +287,7 @@ class ConfigWindow:
                 btn.configure(fg_color="transparent")
 
         tab_command()
+        self._update_preview_enabled()
 
     def _show_display_tab(self):
         """Show the display tab"""
@@ -269,6 +308,7 @@ class ConfigWindow:
         self.debug_tab.pack(fill="both", expand=True, padx=10, pady=10)
         self._update_debug_info()
 
+    @traced()
     def _select_monitor(self, monitor_index):
         """Handle monitor selection"""
         config["capture"]["monitor_index"] = monitor_index
@@ -276,13 +316,16 @@ class ConfigWindow:
         for card, idx in self.monitor_buttons:
             is_selected = idx == monitor_index
             card.configure(
-                fg_color=COLORS["card_selected"]
-                if is_selected
-                else COLORS["card_unselected"],
+                fg_color=(
+                    COLORS["card_selected"]
+                    if is_selected
+                    else COLORS["card_unselected"]
+                ),
                 border_color=COLORS["accent"] if is_selected else COLORS["border"],
             )
         self._save_config()
 
+    @traced()
     def _identify_monitors(self):
         """Show identification overlays on all monitors"""
         if self.monitors_info:
@@ -292,6 +335,34 @@ class ConfigWindow:
                 "No Monitors", "No monitors detected to identify.", parent=self.root
             )
 
+    def _update_preview_enabled(self):
+        """Let the engine publish thumbnails only while the debug tab is shown"""
+        get_preview().set_enabled(
+            self.window_visible
+            and self.main_frame is not None
+            and self.current_tab == "debug"
+        )
+
+    def _refresh_preview(self):
+        """Render the latest published thumbnail, at a fixed low rate"""
+        self.root.after(RENDER_INTERVAL_MS, self._refresh_preview)
+        preview = get_preview()
+        if not preview.enabled or "preview_label" not in self.debug_widgets:
+            return
+
+        (width, height), version = preview.read(self.preview_pixels)
+        if version == self.preview_version or not width:
+            return
+        self.preview_version = version
+
+        image = Image.fromarray(self.preview_pixels[:height, :width])
+        current = self.preview_image
+        if current is None or (current.width(), current.height()) != (width, height):
+            self.preview_image = ImageTk.PhotoImage(image)
+            self.debug_widgets["preview_label"].configure(image=self.preview_image)
+        else:
+            current.paste(image)
+
     def _update_debug_info(self):
         """Update debug tab information"""
         if not self.debug_widgets:
@@ -306,6 +377,7 @@ class ConfigWindow:
                 self.debug_widgets["resolution_value"].configure(text=res_text)
                 break
 
+    @traced()
     def update_debug_color(self, rgb, hsv):
         """
         Update debug tab with current color
@@ -330,8 +402,23 @@ class ConfigWindow:
         except Exception as e:
             print(f"Error updating debug color: {e}")
 
+    @traced()
     def update_debug_stats(
-        self, fps=0, update_rate=0, total_captures=0, uptime="00:00:00"
+        self,
+        fps=0,
+        update_rate=0,
+        total_captures=0,
+        uptime="00:00:00",
+        bulb_status="Offline",
+        reconnects=0,
+        downtime="00:00:00",
+        send_rate=0,
+        rtt=0,
+        memory="n/a",
+        downsample="-",
+        latency="-",
+        cpu="-",
+        power_mode="-",
     ):
         """
         Update debug tab statistics
@@ -342,6 +429,16 @@ class ConfigWindow:
             update_rate: Update rate in milliseconds
             total_captures: Total number of captures
             uptime: Uptime string (HH:MM:SS)
+            bulb_status: Bulb connection state
+            reconnects: Number of reconnects after a lost connection
+            downtime: Total time the bulb was offline (HH:MM:SS)
+            send_rate: Adaptive command rate in Hz
+            rtt: Smoothed command round-trip time in milliseconds
+            memory: Resident memory of the process
+            downsample: Subsampling factor in use, and whether it is adaptive
+            latency: Median capture-to-bulb latency of normal frames and cuts
+            cpu: Process CPU use and the budget the governor enforces
+            power_mode: Power source and governor level
         """
         if not self.debug_widgets:
             return
@@ -351,21 +448,68 @@ class ConfigWindow:
             self.debug_widgets["update_rate_value"].configure(
                 text=f"{update_rate:.0f} ms"
             )
+            self.debug_widgets["cpu_value"].configure(text=cpu)
+            self.debug_widgets["power_mode_value"].configure(text=power_mode)
             self.debug_widgets["captures_value"].configure(text=str(total_captures))
             self.debug_widgets["uptime_value"].configure(text=uptime)
+            self.debug_widgets["bulb_value"].configure(text=bulb_status)
+            self.debug_widgets["reconnects_value"].configure(text=str(reconnects))
+            self.debug_widgets["downtime_value"].configure(text=downtime)
+            self.debug_widgets["send_rate_value"].configure(
+                text=f"{send_rate:.1f} Hz ({rtt:.0f} ms RTT)"
+            )
+            self.debug_widgets["memory_value"].configure(text=memory)
+            self.debug_widgets["downsample_value"].configure(text=downsample)
+            self.debug_widgets["latency_value"].configure(text=latency)
         except Exception as e:
             print(f"Error updating debug stats: {e}")
 
+    @traced()
     def _hide_window(self):
         """Hide window instead of closing it"""
         self.root.withdraw()
+        self.window_visible = False
+        self._update_preview_enabled()
+        if config.get("gui", {}).get("low_memory_tray", 0):
+            self._release_ui()
         show_notification("Config window minimized to tray")
 
+    def _release_ui(self):
+        """
+        Destroy the widget tree and cached icons while hidden in the tray,
+        keeping only the withdrawn root for the Tk event loop
+        """
+        if self.main_frame is None:
+            return
+
+        before = rss_bytes()
+        self.debug_widgets = {}
+        self.preview_image = None
+        self.monitor_buttons = []
+        self.tab_buttons = []
+        self.entries.clear()
+        self.main_frame.destroy()
+        self.main_frame = None
+        self.display_tab = self.settings_tab = self.debug_tab = None
+        self.content_area = None
+        clear_icon_cache()
+        gc.collect()
+
+        print(
+            f"Config window released: RSS {format_bytes(before)} -> "
+            f"{format_bytes(rss_bytes())}"
+        )
+
+    @traced()
     def show_window(self):
-        """Show the window again"""
+        """Show the window again, rebuilding it if it was released"""
+        if self.main_frame is None:
+            self._create_ui()
         self.root.deiconify()
         self.root.lift()
         self.root.focus_force()
+        self.window_visible = True
+        self._update_preview_enabled()
 
     def _create_tray_icon(self):
         """Create system tray icon"""
@@ -382,6 +526,9 @@ class ConfigWindow:
             pystray.MenuItem("Show Config", self._on_show_clicked, default=True),
             pystray.MenuItem("Save Config", self._on_save_clicked),
             pystray.MenuItem("Reload Config", self._on_reload_clicked),
+            pystray.MenuItem("Profile", pystray.Menu(self._profile_menu_items)),
+            pystray.MenuItem("Profile CPU", self._on_profile_clicked),
+            pystray.MenuItem("Dump Trace", self._on_dump_trace_clicked),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem("Exit", self._on_exit_clicked),
         )
@@ -403,6 +550,36 @@ class ConfigWindow:
     def _on_reload_clicked(self, icon, item):
         self.root.after(0, self._reload_config)
 
+    def _profile_menu_items(self):
+        """One radio item per configured profile, rebuilt when the menu opens"""
+        profiles = get_profiles()
+        return [
+            pystray.MenuItem(
+                name,
+                lambda icon, item, name=name: self._on_profile_selected(name),
+                checked=lambda item, name=name: profiles.active == name,
+                radio=True,
+            )
+            for name in profiles.names()
+        ]
+
+    def _on_profile_selected(self, name):
+        if switch_profile(name):
+            self.root.after(0, self._rebuild_settings_tab)
+
+    def _on_profile_clicked(self, icon, item):
+        def done(path):
+            show_notification(f"Profile written to {path}")
+
+        if start_profiling(config, on_done=done):
+            seconds = config.get("profiling", {}).get("seconds", 10)
+            show_notification(f"Profiling for {seconds}s")
+
+    def _on_dump_trace_clicked(self, icon, item):
+        path = dump_trace()
+        if path:
+            show_notification(f"Trace written to {path}")
+
     def _on_exit_clicked(self, icon, item):
         self.tray_icon.stop()
         self.root.quit()
@@ -562,6 +739,7 @@ X-GNOME-Autostart-enabled=true
         elif IS_LINUX:
             self._toggle_startup_linux()
 
+    @traced()
     def _save_config(self):
         """Save all entries back to config and file"""
         try:
@@ -588,13 +766,13 @@ X-GNOME-Autostart-enabled=true
         except Exception as e:
             messagebox.showerror("Error", f"Error saving config: {e}", parent=self.root)
 
+    @traced()
     def _reload_config(self):
         """Reload config from file and update UI"""
         try:
             if reload_config():
-                for full_key, (entry, data_dict, key) in self.entries.items():
-                    entry.delete(0, "end")
-                    entry.insert(0, str(data_dict[key]))
+                # Reloading replaces the section dicts the entries point to
+                self._rebuild_settings_tab()
 
                 messagebox.showinfo(
                     "Success", "Configuration reloaded from file!", parent=self.root
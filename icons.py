@@ -59,6 +59,11 @@ def load_icon(name, size=(20, 20)):
         return None
 
 
+def clear_icon_cache():
+    """Drop all cached icon images, e.g. once the widgets using them are gone"""
+    _icon_cache.clear()
+
+
 class Icons:
     """Container for commonly used icons"""
 
@@ -0,0 +1,166 @@
+"""
+Optional JIT-compiled color kernel
+Fuses boosts, hue classification, weighting and accumulation into a
+single pass over the uint8 frame, with no temporary arrays.
+Requires numba; without it the NumPy pipeline in color_utils is used.
+"""
+
+import numpy as np
+from config import add_config_listener
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+MAX_CACHED_PARAMS = 16
+
+_warned = False
+_params = {}
+
+
+def kernel_enabled(config):
+    """Check whether the JIT kernel should be used for the weighted mean"""
+    global _warned
+    kernel = config["capture"].get("kernel", "auto")
+    if kernel == "numpy":
+        return False
+    if not NUMBA_AVAILABLE:
+        if kernel == "numba" and not _warned:
+            print("numba not installed, using NumPy color pipeline")
+            _warned = True
+        return False
+    return True
+
+
+def kernel_params(config):
+    """
+    Kernel parameters for a config dict as a float32 array
+
+    Cached by the values themselves, so short-lived copies (profile merges,
+    governed configs) share one array and never see another config's.
+    """
+    key = _param_values(config)
+    params = _params.get(key)
+    if params is None:
+        if len(_params) >= MAX_CACHED_PARAMS:
+            _params.clear()
+        params = _params[key] = np.array(key, dtype=np.float32)
+    return params
+
+
+def clear_kernel_params():
+    _params.clear()
+
+
+add_config_listener(lambda config: clear_kernel_params())
+
+
+def _param_values(config):
+    """The config values used by the kernel, in kernel order"""
+    boosts = config["color_boosts"]
+    hue = config["hue_adjustments"]
+    w = config["weighting"]
+    return (
+        boosts["red"],
+        boosts["green"],
+        boosts["blue"],
+        hue["yellow_boost"],
+        hue["yellow_hue_min"],
+        hue["yellow_hue_max"],
+        hue["cyan_boost"],
+        hue["cyan_hue_min"],
+        hue["cyan_hue_max"],
+        hue["magenta_boost"],
+        hue["magenta_hue_min"],
+        hue["magenta_hue_max"],
+        w["brightness_power"],
+        w["saturation_power"],
+        w["saturation_threshold"],
+        w["luminance_threshold"],
+        w["overall_multiplier"],
+    )
+
+
+def _weighted_sums(frame, p):
+    """
+    Per-pixel port of ColorWorkspace.weigh plus the weighted sum
+
+    Mirrors the NumPy code step by step in float32, including the order in
+    which overlapping hue masks overwrite each other (blue > green > red).
+    """
+    zero = np.float32(0.0)
+    full = np.float32(255.0)
+    sum_r = 0.0
+    sum_g = 0.0
+    sum_b = 0.0
+    total = 0.0
+
+    for y in range(frame.shape[0]):
+        for x in range(frame.shape[1]):
+            r = min(max(np.float32(frame[y, x, 2]) * p[0], zero), full)
+            g = min(max(np.float32(frame[y, x, 1]) * p[1], zero), full)
+            b = min(max(np.float32(frame[y, x, 0]) * p[2], zero), full)
+
+            rn = r / full
+            gn = g / full
+            bn = b / full
+            max_c = max(rn, gn, bn)
+            min_c = min(rn, gn, bn)
+            diff = max_c - min_c
+
+            saturation = diff / max_c if max_c > 0 else zero
+
+            hue = zero
+            if diff > 0:
+                if max_c == bn:
+                    hue = (60 * ((rn - gn) / diff) + 240) % 360
+                elif max_c == gn:
+                    hue = (60 * ((bn - rn) / diff) + 120) % 360
+                else:
+                    hue = (60 * ((gn - bn) / diff) + 360) % 360
+
+            if p[3] != 1.0 and p[4] <= hue <= p[5]:
+                r *= p[3]
+                g *= p[3]
+            if p[6] != 1.0 and p[7] <= hue <= p[8]:
+                g *= p[6]
+                b *= p[6]
+            if p[9] != 1.0 and p[10] <= hue <= p[11]:
+                r *= p[9]
+                b *= p[9]
+
+            r = min(max(r, zero), full)
+            g = min(max(g, zero), full)
+            b = min(max(b, zero), full)
+
+            luminance = (
+                np.float32(0.299) * r + np.float32(0.587) * g + np.float32(0.114) * b
+            )
+            if luminance < p[15]:
+                continue
+
+            weight = (luminance / full) ** p[12] * saturation ** p[13] * p[16]
+            if saturation < p[14]:
+                weight *= np.float32(0.1)
+
+            sum_r += r * weight
+            sum_g += g * weight
+            sum_b += b * weight
+            total += weight
+
+    return sum_r, sum_g, sum_b, total
+
+
+if NUMBA_AVAILABLE:
+    _weighted_sums = njit(cache=True, nogil=True)(_weighted_sums)
+
+
+def weighted_mean_color_jit(frame, config):
+    """Same result as color_utils.weighted_mean_color, in one fused pass"""
+    sum_r, sum_g, sum_b, total = _weighted_sums(frame, kernel_params(config))
+    if total > 0:
+        return (int(sum_r / total), int(sum_g / total), int(sum_b / total))
+    return (0, 0, 0)
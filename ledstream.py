@@ -0,0 +1,233 @@
+"""
+Real-time LED outputs
+Streams the computed color, or the edge zones spread along a strip, to
+LED controllers such as WLED or ESP32 boards as DDP or E1.31 (sACN) UDP
+packets. Packets are built once and only their pixel data and sequence
+numbers are rewritten per frame; nothing waits for a reply, so these
+outputs can run at the full capture rate alongside the bulb.
+"""
+
+import socket
+import struct
+import uuid
+import numpy as np
+
+DDP_PORT = 4048
+DDP_HEADER = struct.Struct("!BBBBIH")
+DDP_VERSION = 0x40
+DDP_PUSH = 0x01
+DDP_TYPE_RGB24 = 0x0B
+DDP_ID_DISPLAY = 1
+DDP_MAX_DATA = 1440
+
+E131_PORT = 5568
+E131_HEADER_SIZE = 126
+E131_MAX_SLOTS = 510
+E131_PRIORITY = 100
+E131_SOURCE_NAME = b"Smart Bulb Sync"
+ACN_PACKET_ID = b"ASC-E1.17\x00\x00\x00"
+
+
+class LedOutput:
+    """Pixel buffer, zone mapping and a non-blocking UDP socket"""
+
+    def __init__(self, host, port, pixels):
+        self.address = (host, port)
+        self.pixels = np.zeros((pixels, 3), dtype=np.uint8)
+        self.pixel_bytes = memoryview(self.pixels).cast("B")
+        self.zone_count = None
+        self.zone_index = None
+        self.zone_colors = None
+        self.sequence = 0
+        self.frames = 0
+        self.packets = 0
+        self.dropped = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.packet_views = []
+        self.addresses = []
+
+    def set_colors(self, colors):
+        """Fill the strip: one color everywhere, or zones spread evenly along it"""
+        count = len(colors)
+        if count != self.zone_count:
+            self.zone_count = count
+            self.zone_colors = np.zeros((count, 3), dtype=np.uint8)
+            self.zone_index = np.arange(len(self.pixels)) * count // len(self.pixels)
+        for i, color in enumerate(colors):
+            self.zone_colors[i] = color
+        np.take(self.zone_colors, self.zone_index, axis=0, out=self.pixels)
+
+    def send(self, colors):
+        """
+        Send one frame; never blocks
+
+        Args:
+            colors: RGB tuples, a single color or the zones in strip order
+
+        Returns:
+            True if every packet of the frame was handed to the network
+        """
+        self.set_colors(colors)
+        self.sequence = self._next_sequence()
+        self._fill_packets()
+        sent = True
+        for view, address in zip(self.packet_views, self.addresses):
+            try:
+                self.sock.sendto(view, address)
+                self.packets += 1
+            except (BlockingIOError, OSError):
+                # A newer frame follows shortly, so just drop this one
+                self.dropped += 1
+                sent = False
+        self.frames += 1
+        return sent
+
+    def _next_sequence(self):
+        raise NotImplementedError
+
+    def _fill_packets(self):
+        raise NotImplementedError
+
+    def close(self):
+        self.sock.close()
+
+
+class DDPOutput(LedOutput):
+    """Distributed Display Protocol, as accepted by WLED on port 4048"""
+
+    def __init__(self, host, pixels, port=DDP_PORT):
+        super().__init__(host, port, pixels)
+        total = len(self.pixel_bytes)
+        self.chunks = []
+        self.buffers = []
+        for offset in range(0, total, DDP_MAX_DATA):
+            length = min(DDP_MAX_DATA, total - offset)
+            buffer = bytearray(DDP_HEADER.size + length)
+            last = offset + length == total
+            flags = DDP_VERSION | (DDP_PUSH if last else 0)
+            DDP_HEADER.pack_into(
+                buffer, 0, flags, 0, DDP_TYPE_RGB24, DDP_ID_DISPLAY, offset, length
+            )
+            self.chunks.append((offset, length))
+            self.buffers.append(buffer)
+        self.packet_views = [memoryview(buffer) for buffer in self.buffers]
+        self.addresses = [self.address] * len(self.buffers)
+
+    def _next_sequence(self):
+        # 4-bit sequence, 0 means "not used"
+        return self.sequence % 15 + 1
+
+    def _fill_packets(self):
+        for (offset, length), view in zip(self.chunks, self.packet_views):
+            view[1] = self.sequence
+            view[DDP_HEADER.size :] = self.pixel_bytes[offset : offset + length]
+
+
+def e131_multicast_address(universe):
+    return f"239.255.{universe >> 8}.{universe & 0xFF}"
+
+
+class E131Output(LedOutput):
+    """
+    E1.31 (streaming ACN), one packet per universe of up to 170 RGB pixels;
+    each universe goes to its own multicast group when host is empty
+    """
+
+    def __init__(self, host, pixels, universe=1, port=E131_PORT):
+        super().__init__(host or e131_multicast_address(universe), port, pixels)
+        cid = uuid.uuid4().bytes
+        name = E131_SOURCE_NAME.ljust(64, b"\x00")
+        total = len(self.pixel_bytes)
+        self.chunks = []
+        self.buffers = []
+        for index, offset in enumerate(range(0, total, E131_MAX_SLOTS)):
+            slots = min(E131_MAX_SLOTS, total - offset)
+            size = E131_HEADER_SIZE + slots
+            buffer = bytearray(size)
+            struct.pack_into(
+                "!HH12sHI16s",
+                buffer,
+                0,
+                0x0010,
+                0,
+                ACN_PACKET_ID,
+                0x7000 | (size - 16),
+                0x00000004,
+                cid,
+            )
+            struct.pack_into(
+                "!HI64sBHBBH",
+                buffer,
+                38,
+                0x7000 | (size - 38),
+                0x00000002,
+                name,
+                E131_PRIORITY,
+                0,
+                0,
+                0,
+                universe + index,
+            )
+            struct.pack_into(
+                "!HBBHHHB",
+                buffer,
+                115,
+                0x7000 | (size - 115),
+                0x02,
+                0xA1,
+                0,
+                1,
+                slots + 1,
+                0,
+            )
+            self.chunks.append((offset, slots))
+            self.buffers.append(buffer)
+            if host:
+                self.addresses.append(self.address)
+            else:
+                self.addresses.append((e131_multicast_address(universe + index), port))
+        self.packet_views = [memoryview(buffer) for buffer in self.buffers]
+
+    def _next_sequence(self):
+        return (self.sequence + 1) & 0xFF
+
+    def _fill_packets(self):
+        for (offset, slots), view in zip(self.chunks, self.packet_views):
+            view[111] = self.sequence
+            view[E131_HEADER_SIZE:] = self.pixel_bytes[offset : offset + slots]
+
+
+def open_led_output(config):
+    """The LED output configured in the "led" section, or None"""
+    led = config.get("led", {})
+    protocol = led.get("protocol", "off")
+    if protocol == "off":
+        return None
+
+    pixels = int(led.get("pixels", 60))
+    try:
+        if protocol == "ddp":
+            if not led.get("host"):
+                print("DDP output needs the controller address in led.host")
+                return None
+            output = DDPOutput(led["host"], pixels, led.get("port") or DDP_PORT)
+        elif protocol == "e131":
+            output = E131Output(
+                led.get("host", ""),
+                pixels,
+                led.get("universe", 1),
+                led.get("port") or E131_PORT,
+            )
+        else:
+            print(f"Unknown LED protocol: {protocol}")
+            return None
+    except OSError as e:
+        print(f"LED output unavailable: {e}")
+        return None
+
+    print(
+        f"Streaming {pixels} pixels as {protocol.upper()} to "
+        f"{output.address[0]}:{output.address[1]}"
+    )
+    return output
@@ -3,16 +3,40 @@ import signal
 import threading
 import sys
 import time
+from collections import deque
 from datetime import datetime
 from config import load_config, reload_config, get_config, CONFIG_FILE
-from bulb import discover_bulb
+from supervisor import BulbSupervisor
+from bulb import discover_bulb, BROADCAST_TARGET
 from monitor import init_sct, get_monitor_index
+from topology import start_topology
+from profiles import switch_profile, track_topology
 from color_utils import get_average_color_fast, rgb_to_hsv_vibrant
-from gui import show_config_window, get_config_window
+from edges import get_edge_colors
+from xdamage import get_damage_color
+from tracing import span, configure_tracing, dump_trace
+from profiler import start_profiling
+from procstats import rss_bytes, format_bytes
+from downsample import downsample_status
+from scenecut import observe_colors, take_scene_cut, scene_cut_enabled, get_detector
+from colorstream import open_sender
+from ledstream import open_led_output
+from governor import govern, governor_status
 from watchfiles import awatch
 
+try:
+    # The capture loop also runs headless (benchmark.py, soak.py)
+    from gui import show_config_window, get_config_window
+
+    GUI_AVAILABLE = True
+except ImportError:
+    GUI_AVAILABLE = False
+
 stop_flag = False
 sct = None
+supervisor = None
+sender = None
+led_output = None
 
 stats = {
     "start_time": None,
@@ -21,12 +45,32 @@ stats = {
     "fps_samples": [],
     "current_rgb": (0, 0, 0),
     "current_hsv": (0, 0, 0),
+    "segments": [],
+    "latency": {"normal": deque(maxlen=100), "cut": deque(maxlen=100)},
 }
 
 
-def update_debug_display():
+def format_duration(seconds):
+    """Format seconds as HH:MM:SS"""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def format_latency():
+    """Median capture-to-bulb latency of normal frames and scene cuts"""
+    parts = []
+    for kind in ("normal", "cut"):
+        samples = sorted(stats["latency"][kind])
+        value = f"{samples[len(samples) // 2]:.0f} ms" if samples else "-"
+        parts.append(f"{kind} {value}")
+    return f"{' / '.join(parts)} ({get_detector().cuts} cuts)"
+
+
+def update_debug_display(config=None):
     """Update the debug tab with current statistics"""
-    config_window = get_config_window()
+    config_window = get_config_window() if GUI_AVAILABLE else None
+    config = config or get_config()
 
     if not config_window or not hasattr(config_window, "debug_widgets"):
         return
@@ -48,10 +92,9 @@ def update_debug_display():
         )
 
         if stats["start_time"]:
-            uptime_seconds = int((datetime.now() - stats["start_time"]).total_seconds())
-            hours, remainder = divmod(uptime_seconds, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            uptime_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+            uptime_str = format_duration(
+                (datetime.now() - stats["start_time"]).total_seconds()
+            )
         else:
             uptime_str = "00:00:00"
 
@@ -62,12 +105,25 @@ def update_debug_display():
         )
 
         config_window.update_debug_color(stats["current_rgb"], stats["current_hsv"])
+        power_mode, cpu = governor_status()
 
         config_window.update_debug_stats(
             fps=avg_fps,
             update_rate=update_rate,
             total_captures=stats["total_captures"],
             uptime=uptime_str,
+            bulb_status="Online" if supervisor and supervisor.online else "Offline",
+            reconnects=supervisor.reconnects if supervisor else 0,
+            downtime=format_duration(
+                supervisor.current_downtime() if supervisor else 0
+            ),
+            send_rate=supervisor.rate.rate if supervisor else 0,
+            rtt=(supervisor.rate.srtt or 0) * 1000 if supervisor else 0,
+            memory=format_bytes(rss_bytes()),
+            downsample=downsample_status(config),
+            latency=format_latency(),
+            cpu=cpu,
+            power_mode=power_mode,
         )
 
     except Exception:
@@ -77,11 +133,112 @@ def update_debug_display():
 async def watch_config():
     """Watch config file for changes and reload automatically"""
     async for changes in awatch(CONFIG_FILE):
-        reload_config()
+        with span("config_reload", "config"):
+            reload_config()
+            configure_tracing(get_config(), force="--trace" in sys.argv)
+
+
+async def run_iteration(config, monitor):
+    """One capture, color conversion and send step of the sync loop"""
+    mode = config["capture"].get("mode", "full")
+    captured_at = time.monotonic()
+    with span("capture", args={"mode": mode}):
+        damaged = mode == "xdamage" and get_damage_color(sct, monitor, config)
+        if damaged:
+            (r, g, b), changed = damaged
+        elif mode == "edges":
+            (r, g, b), stats["segments"] = get_edge_colors(sct, monitor, config)
+            observe_colors(stats["segments"], config)
+        else:
+            r, g, b = get_average_color_fast(sct, monitor, config)
+
+    if damaged and not changed:
+        with span("sleep"):
+            await asyncio.sleep(config["capture"]["update_delay"])
+        return
+
+    with span("color"):
+        h, s, v = rgb_to_hsv_vibrant(r, g, b)
+
+    stats["current_rgb"] = (r, g, b)
+    stats["current_hsv"] = (h, s, v)
+    stats["total_captures"] += 1
+
+    if stats["total_captures"] % 5 == 0:
+        with span("debug_display"):
+            update_debug_display(config)
+
+    stats["last_update_time"] = time.time()
+
+    if led_output:
+        # Fire and forget every frame, the strip is not rate limited like the bulb
+        colors = stats["segments"] if mode == "edges" else None
+        with span("led", "net"):
+            try:
+                led_output.send(colors or [(r, g, b)])
+            except Exception as e:
+                print(f"LED output error: {e}")
+
+    if sender:
+        # Capture node: the controller on the other end drives the bulb
+        cut = take_scene_cut()
+        transition_ms = config["capture"].get("transition_ms", 500)
+        if cut:
+            transition_ms = config["capture"].get("scene_cut_transition_ms", 0)
+        colors = [(r, g, b)]
+        if mode == "edges":
+            colors += stats["segments"]
+        with span("stream", "net", {"cut": cut}):
+            sender.send(colors, transition_ms, cut)
+        with span("sleep"):
+            await asyncio.sleep(config["capture"]["update_delay"])
+        return
+
+    if not supervisor.online:
+        with span("wait_connected"):
+            await supervisor.wait_connected(
+                timeout=config["capture"].get("offline_delay", 0.5)
+            )
+        return
+
+    update_delay = config["capture"]["update_delay"]
+    transition_ms = config["capture"].get("transition_ms", 500)
+    cut = take_scene_cut()
+    if cut:
+        transition_ms = config["capture"].get("scene_cut_transition_ms", 0)
+
+    if config["capture"].get("adaptive_rate", 1):
+        rate = supervisor.rate
+        rate.set_max_rate(1 / max(update_delay, 0.001))
+        # XDamage only reports a change once and does not feed the scene-cut
+        # detector, so a frame skipped there would never be sent
+        watch_cuts = scene_cut_enabled(config) and mode != "xdamage"
+        if not cut:
+            transition_ms = rate.transition_ms(transition_ms)
+            if watch_cuts and rate.delay() > 0:
+                # Keep capturing between rate-limited commands so a cut
+                # can jump the queue
+                with span("sleep"):
+                    await asyncio.sleep(min(update_delay, rate.delay()))
+                return
+        with span("send", "bulb", {"cut": cut}):
+            sent = await supervisor.set_hsv(h, s, v, transition_ms)
+        delay = update_delay if watch_cuts else max(update_delay, rate.delay())
+    else:
+        with span("send", "bulb", {"cut": cut}):
+            sent = await supervisor.set_hsv(h, s, v, transition_ms)
+        delay = update_delay
+
+    if sent:
+        latency = (time.monotonic() - captured_at) * 1000
+        stats["latency"]["cut" if cut else "normal"].append(latency)
+
+    with span("sleep"):
+        await asyncio.sleep(delay)
 
 
 async def main():
-    global stop_flag, sct, stats
+    global stop_flag, sct, stats, supervisor, sender, led_output
 
     try:
         load_config()
@@ -96,21 +253,34 @@ async def main():
         return
 
     sct = init_sct()
+    track_topology(start_topology())
     monitor_index = get_monitor_index(config)
 
     stats["start_time"] = datetime.now()
     stats["last_update_time"] = time.time()
 
     start_minimized = "--minimized" in sys.argv
+    if "--use-profile" in sys.argv[:-1]:
+        switch_profile(sys.argv[sys.argv.index("--use-profile") + 1])
+    configure_tracing(config, force="--trace" in sys.argv)
 
-    gui_thread = threading.Thread(
-        target=show_config_window, args=(start_minimized,), daemon=True
-    )
-    gui_thread.start()
-
-    bulb = await discover_bulb()
-    if not bulb:
-        return
+    if GUI_AVAILABLE:
+        gui_thread = threading.Thread(
+            target=show_config_window, args=(start_minimized,), daemon=True
+        )
+        gui_thread.start()
+    else:
+        print("GUI dependencies missing, running without the config window")
+
+    sender = open_sender(config)
+    led_output = open_led_output(config)
+    supervisor_task = None
+    if not sender:
+        discovery_target = config.get("bulb", {}).get(
+            "discovery_target", BROADCAST_TARGET
+        )
+        supervisor = BulbSupervisor(lambda: discover_bulb(discovery_target))
+        supervisor_task = asyncio.create_task(supervisor.run())
 
     stop_event = asyncio.Event()
 
@@ -123,6 +293,12 @@ async def main():
         print("\n👋 Bye!")
 
     signal.signal(signal.SIGINT, stop_signal)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: dump_trace())
+        signal.signal(signal.SIGUSR2, lambda *_: start_profiling(get_config()))
+
+    if "--profile" in sys.argv:
+        start_profiling(config)
 
     watcher_task = asyncio.create_task(watch_config())
 
@@ -130,38 +306,24 @@ async def main():
 
     try:
         while not stop_event.is_set():
+            # Re-read every frame so a profile switch applies immediately,
+            # then let the governor trade quality for CPU time if needed
+            config = govern(get_config())
             new_monitor = config["capture"].get("monitor_index", 1)
             if new_monitor != current_monitor:
                 current_monitor = new_monitor
 
-            r, g, b = get_average_color_fast(sct, current_monitor)
-            h, s, v = rgb_to_hsv_vibrant(r, g, b)
-
-            stats["current_rgb"] = (r, g, b)
-            stats["current_hsv"] = (h, s, v)
-            stats["total_captures"] += 1
-
-            if stats["total_captures"] % 5 == 0:
-                update_debug_display()
-
-            stats["last_update_time"] = time.time()
-
-            try:
-                if bulb.modules.get("Light"):
-                    transition_ms = config["capture"].get("transition_ms", 500)
-                    await bulb.modules["Light"].set_hsv(
-                        h, s, v, transition=transition_ms
-                    )
-            except Exception as e:
-                print(f"Connection lost: {e}")
-                bulb = await discover_bulb()
-                if not bulb:
-                    break
-
-            await asyncio.sleep(config["capture"]["update_delay"])
+            with span("iteration"):
+                await run_iteration(config, current_monitor)
 
     finally:
         watcher_task.cancel()
+        if supervisor_task:
+            supervisor_task.cancel()
+        if sender:
+            sender.close()
+        if led_output:
+            led_output.close()
         if sct:
             sct.close()
 
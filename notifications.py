@@ -1,31 +1,153 @@
+"""
+Desktop notifications
+show_notification() only queues the message; a background dispatcher
+delivers it, so callers on the Tk thread never block. Pending duplicates
+are coalesced and the queue is bounded. On Linux messages go straight to
+org.freedesktop.Notifications over one persistent D-Bus session
+connection (needs jeepney); otherwise, or when that fails, they are
+printed.
+"""
+
 import platform
-import subprocess
-from windows_toasts import InteractableWindowsToaster, Toast
+import threading
+from collections import deque
 
 IS_WINDOWS = platform.system() == "Windows"
 IS_LINUX = platform.system() == "Linux"
 
-interactableToaster = None
-if IS_WINDOWS:
-    try:
-        interactableToaster = InteractableWindowsToaster(
-            applicationText="Light Bulb Configurator"
+APP_NAME = "Smart Bulb Config"
+MAX_PENDING = 16
+EXPIRE_MS = 4000
+
+try:
+    from windows_toasts import InteractableWindowsToaster, Toast
+
+    WINDOWS_TOASTS_AVAILABLE = True
+except ImportError:
+    WINDOWS_TOASTS_AVAILABLE = False
+
+try:
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    JEEPNEY_AVAILABLE = False
+
+
+class DBusNotifier:
+    """Sends notifications over a single long-lived session bus connection"""
+
+    def __init__(self):
+        self.connection = open_dbus_connection(bus="SESSION")
+        self.address = DBusAddress(
+            "/org/freedesktop/Notifications",
+            bus_name="org.freedesktop.Notifications",
+            interface="org.freedesktop.Notifications",
         )
-    except ImportError:
-        interactableToaster = None
+        self.last = (None, 0)
 
+    def show(self, message):
+        # Repeating the last message replaces its bubble instead of stacking
+        last_message, last_id = self.last
+        replaces = last_id if message == last_message else 0
+        call = new_method_call(
+            self.address,
+            "Notify",
+            "susssasa{sv}i",
+            (APP_NAME, replaces, "", APP_NAME, message, [], {}, EXPIRE_MS),
+        )
+        reply = self.connection.send_and_get_reply(call, timeout=2)
+        self.last = (message, reply.body[0])
+
+    def close(self):
+        self.connection.close()
+
+
+class ToastNotifier:
+    """Windows toast notifications"""
+
+    def __init__(self):
+        self.toaster = InteractableWindowsToaster(applicationText=APP_NAME)
+
+    def show(self, message):
+        self.toaster.show_toast(Toast([message]))
+
+    def close(self):
+        pass
+
+
+class NotificationDispatcher:
+    """Bounded, coalescing queue drained by one daemon thread"""
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self.pending = deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.backend = None
+        self.backend_failed = False
+        self.delivered = 0
+        self.dropped = 0
+        self._thread = None
+
+    def post(self, message):
+        """Queue a message; returns immediately"""
+        with self.condition:
+            if message in self.pending:
+                self.dropped += 1
+                return
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(message)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="notifications", daemon=True
+                )
+                self._thread.start()
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                message = self.pending.popleft()
+            self._deliver(message)
+
+    def _open_backend(self):
+        if IS_WINDOWS and WINDOWS_TOASTS_AVAILABLE:
+            return ToastNotifier()
+        if IS_LINUX and JEEPNEY_AVAILABLE:
+            return DBusNotifier()
+        return None
+
+    def _deliver(self, message):
+        if self.backend is None and not self.backend_failed:
+            try:
+                self.backend = self._open_backend()
+            except Exception as e:
+                print(f"Notifications unavailable: {e}")
+            self.backend_failed = self.backend is None
+
+        if self.backend is not None:
+            try:
+                self.backend.show(message)
+                self.delivered += 1
+                return
+            except Exception as e:
+                # Retry with a fresh connection for the next message
+                print(f"Notification failed: {e}")
+                try:
+                    self.backend.close()
+                except Exception:
+                    pass
+                self.backend = None
 
-def show_notification(message):
-    """Cross-platform notification system"""
-    if IS_WINDOWS and interactableToaster:
-        newToast = Toast([message])
-        interactableToaster.show_toast(newToast)
-    elif IS_LINUX:
-        try:
-            subprocess.run(
-                ["notify-send", "Smart Bulb Config", message], check=False, timeout=2
-            )
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            print(f"Notification: {message}")
-    else:
         print(f"Notification: {message}")
+
+
+_dispatcher = NotificationDispatcher()
+
+
+def show_notification(message):
+    """Cross-platform notification system, never blocks the caller"""
+    _dispatcher.post(message)
@@ -0,0 +1,115 @@
+"""
+Capture preview for the debug tab
+The engine publishes a small thumbnail of the frame it just processed into
+a preallocated buffer, optionally darkening pixels by how little they
+count towards the color. The GUI reads it at a low fixed rate, so the
+preview needs no extra screen grab. Publishing is skipped entirely unless
+the GUI is showing the debug tab.
+"""
+
+import threading
+import time
+import numpy as np
+from workspace import get_workspace
+
+THUMB_WIDTH = 240
+THUMB_HEIGHT = 135
+RENDER_INTERVAL_MS = 250
+PUBLISH_INTERVAL = RENDER_INTERVAL_MS / 1000
+MIN_BRIGHTNESS = 0.15
+
+
+class FramePreview:
+    """Latest thumbnail, written by the engine and read by the GUI"""
+
+    def __init__(self):
+        self.enabled = False
+        self.show_weights = False
+        self.version = 0
+        self.shape = None
+        self.rows = None
+        self.cols = None
+        self.buffer = np.zeros((THUMB_HEIGHT, THUMB_WIDTH, 3), dtype=np.uint8)
+        self.size = (0, 0)
+        self.last_publish = 0.0
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        """Called by the GUI when the preview becomes visible or hidden"""
+        self.enabled = enabled
+
+    def set_show_weights(self, show):
+        """Darken pixels by how little they count towards the color"""
+        self.show_weights = show
+
+    def _layout(self, shape):
+        """Nearest-neighbour sample positions that fit the frame in the buffer"""
+        self.shape = shape
+        height, width = shape
+        scale = min(THUMB_WIDTH / width, THUMB_HEIGHT / height, 1.0)
+        thumb_w, thumb_h = max(int(width * scale), 1), max(int(height * scale), 1)
+        self.rows = (np.arange(thumb_h) * height // thumb_h)[:, None]
+        self.cols = np.arange(thumb_w) * width // thumb_w
+        self.size = (thumb_w, thumb_h)
+
+    def publish(self, frame, config):
+        """
+        Store a thumbnail of a processed BGRA frame
+
+        Does nothing while disabled or more often than PUBLISH_INTERVAL.
+        """
+        if not self.enabled or frame.ndim != 3:
+            return
+        now = time.monotonic()
+        if now - self.last_publish < PUBLISH_INTERVAL:
+            return
+        self.last_publish = now
+
+        if frame.shape[:2] != self.shape:
+            self._layout(frame.shape[:2])
+        thumb = frame[self.rows, self.cols]
+        thumb_w, thumb_h = self.size
+
+        if self.show_weights:
+            workspace = get_workspace("preview", thumb.shape[:2])
+            workspace.load_bgra(thumb)
+            rgb, weight = workspace.weigh(config)
+            peak = weight.max()
+            if peak > 0:
+                weight /= peak
+            weight *= 1 - MIN_BRIGHTNESS
+            weight += MIN_BRIGHTNESS
+            rgb *= weight[..., None]
+            pixels = rgb
+        else:
+            pixels = thumb[..., 2::-1]
+
+        with self._lock:
+            np.copyto(self.buffer[:thumb_h, :thumb_w], pixels, casting="unsafe")
+            self.version += 1
+
+    def read(self, into):
+        """
+        Copy the latest thumbnail into a caller-owned RGB buffer
+
+        Returns:
+            ((width, height), version) of the copied thumbnail
+        """
+        with self._lock:
+            width, height = self.size
+            np.copyto(into[:height, :width], self.buffer[:height, :width])
+            return self.size, self.version
+
+
+_preview = FramePreview()
+
+
+def get_preview():
+    return _preview
+
+
+def publish_frame(frame, config):
+    """Offer a processed full-mode frame to the debug tab preview"""
+    # A tiles mode frame is a stack of scattered tiles, not a picture
+    if _preview.enabled and config["capture"].get("mode", "full") != "tiles":
+        _preview.publish(frame, config)
@@ -0,0 +1,64 @@
+"""
+Process resource usage
+Resident memory of the current process without extra dependencies:
+/proc on Linux, GetProcessMemoryInfo on Windows, peak RSS elsewhere
+"""
+
+import os
+import platform
+
+IS_WINDOWS = platform.system() == "Windows"
+
+
+def _rss_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    )
+    return counters.WorkingSetSize
+
+
+def rss_bytes():
+    """Current resident set size in bytes, or None if unknown"""
+    try:
+        if IS_WINDOWS:
+            return _rss_windows()
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+        import resource
+
+        # Peak rather than current, in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+
+
+def format_bytes(value):
+    """Human readable size, e.g. 42.1 MB"""
+    if value is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value} B"
+        value /= 1024
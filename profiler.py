@@ -0,0 +1,184 @@
+"""
+On-demand sampling profiler
+Samples the Python stacks of every thread (asyncio loop, GUI, tray, ...)
+from a background thread for a fixed window, then writes the samples in
+collapsed-stack format (speedscope.app, flamegraph.pl) plus a plain-text
+top-N summary of the hottest functions. Samples of a thread blocked in a
+known wait call (selector, lock or condition, Tk mainloop, X event read)
+only count as idle, so waiting threads do not fill the profile.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_SECONDS = 10.0
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 20
+
+# (file path suffix, function) of Python frames that block in C when idle
+WAIT_CALLS = (
+    ("selectors.py", "select"),
+    ("windows_events.py", "_poll"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    (os.path.join("tkinter", "__init__.py"), "mainloop"),
+    (os.path.join("Xlib", "protocol", "display.py"), "send_and_recv"),
+)
+
+
+def _frame_label(code):
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_waiting(code):
+    """Whether an innermost frame is a call that blocks while idle"""
+    return any(
+        code.co_name == name and code.co_filename.endswith(suffix)
+        for suffix, name in WAIT_CALLS
+    )
+
+
+class SamplingProfiler:
+    """Samples all thread stacks at a fixed interval for a time window"""
+
+    def __init__(self, seconds=DEFAULT_SECONDS, interval=DEFAULT_INTERVAL):
+        self.seconds = seconds
+        self.interval = interval
+        self.stacks = Counter()
+        self.idle = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+
+    def run(self):
+        """Sample until the window has passed; call from its own thread"""
+        own = threading.get_ident()
+        names = {}
+        start = time.perf_counter()
+        deadline = start + self.seconds
+
+        while time.perf_counter() < deadline:
+            for thread in threading.enumerate():
+                names.setdefault(thread.ident, thread.name)
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if _is_waiting(frame.f_code):
+                    self.idle[names.get(ident, f"thread-{ident}")] += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+        self.elapsed = time.perf_counter() - start
+
+    def collapsed(self):
+        """Samples as "thread;outer;...;inner count" lines"""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items()
+        )
+
+    def summary(self, top=DEFAULT_TOP):
+        """Readable report of the functions with the most self and total time"""
+        own = Counter()
+        total = Counter()
+        threads = Counter()
+        for stack, count in self.stacks.items():
+            threads[stack[0]] += count
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+
+        lines = [
+            f"{self.samples} samples over {self.elapsed:.1f}s "
+            f"({self.interval * 1000:.1f} ms interval)",
+            "",
+            "Busy samples per thread (idle in a wait call):",
+        ]
+        lines += [
+            f"  {count:7d}  {name} ({self.idle[name]} idle)"
+            for name, count in threads.most_common()
+        ]
+        lines += [
+            f"  {0:7d}  {name} ({count} idle)"
+            for name, count in self.idle.most_common()
+            if name not in threads
+        ]
+        for title, counter in (("Self", own), ("Total", total)):
+            lines += ["", f"Top {top} by {title.lower()} samples:"]
+            for label, count in counter.most_common(top):
+                share = count / max(self.samples, 1) * 100
+                lines.append(f"  {count:7d} {share:6.1f}%  {label}")
+        return "\n".join(lines) + "\n"
+
+
+_lock = threading.Lock()
+_active = None
+
+
+def start_profiling(config, on_done=None):
+    """
+    Profile every thread in the background for the configured window
+
+    Args:
+        config: Config dict; reads the optional "profiling" section
+        on_done: Called with the profile path once it has been written
+
+    Returns:
+        False if a profile is already running
+    """
+    global _active
+    section = config.get("profiling", {})
+    with _lock:
+        if _active is not None:
+            print("Profiler already running")
+            return False
+        profiler = _active = SamplingProfiler(
+            section.get("seconds", DEFAULT_SECONDS),
+            section.get("interval", DEFAULT_INTERVAL),
+        )
+
+    def worker():
+        global _active
+        try:
+            profiler.run()
+            path = write_profile(profiler, section.get("top", DEFAULT_TOP))
+            if on_done:
+                on_done(path)
+        except Exception as e:
+            print(f"Error while profiling: {e}")
+        finally:
+            _active = None
+
+    print(f"Profiling all threads for {profiler.seconds:g}s")
+    threading.Thread(target=worker, name="profiler", daemon=True).start()
+    return True
+
+
+def write_profile(profiler, top=DEFAULT_TOP):
+    """
+    Write the collapsed stacks and the summary next to each other
+
+    Returns:
+        Path of the collapsed-stack profile
+    """
+    base = f"profile-{datetime.now():%Y%m%d-%H%M%S}"
+    summary = profiler.summary(top)
+    with open(f"{base}.txt", "w") as f:
+        f.write(profiler.collapsed())
+    with open(f"{base}-summary.txt", "w") as f:
+        f.write(summary)
+
+    print(summary)
+    print(f"Profile written to {base}.txt and {base}-summary.txt")
+    return f"{base}.txt"
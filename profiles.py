@@ -0,0 +1,126 @@
+"""
+Named tuning profiles
+Profiles in the config's "profiles" section override parts of the base
+config (e.g. "movie", "game", "desktop"). Every profile is merged and its
+derived pipeline state prepared whenever the config changes, so switching
+profiles is a single reference swap picked up on the next frame, with
+nothing written to disk.
+"""
+
+from config import add_config_listener, set_active_config
+from kernels import kernel_params, clear_kernel_params
+from color_utils import _histogram_bin_colors, get_active_region, histogram_bits
+from topology import current_topology
+
+
+def merge(base, overrides):
+    """Copy of base with overrides applied, recursing into nested sections"""
+    merged = {}
+    for key, value in base.items():
+        if key == "profiles":
+            continue
+        merged[key] = dict(value) if isinstance(value, dict) else value
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def prepare(config):
+    """Build the derived state a config needs so its first frame does no setup"""
+    kernel_params(config)
+    capture = config["capture"]
+    _histogram_bin_colors(histogram_bits(config))
+    if current_topology() is not None:
+        prepare_region(config)
+
+
+def prepare_region(config):
+    """Cache the capture rectangle of a config in the current topology"""
+    capture = config["capture"]
+    if not capture.get("auto_crop", 0):
+        get_active_region(None, capture.get("monitor_index", 1), config)
+
+
+class ProfileSet:
+    """Prepared configs for every profile and the currently active one"""
+
+    def __init__(self):
+        self.prepared = {}
+        self.active = None
+
+    def names(self):
+        return list(self.prepared)
+
+    def compile(self, base):
+        """Merge and prepare every profile of the base config"""
+        clear_kernel_params()
+        prepared = {}
+        for name, overrides in base.get("profiles", {}).items():
+            try:
+                merged = merge(base, overrides)
+                prepare(merged)
+                prepared[name] = merged
+            except Exception as e:
+                print(f"Error preparing profile {name}: {e}")
+        self.prepared = prepared
+
+        name = self.active
+        if name not in prepared:
+            name = base.get("active_profile")
+        if name in prepared:
+            self.switch(name)
+        else:
+            self.active = None
+            set_active_config(None)
+
+    def prepare_regions(self, topology=None):
+        """
+        Prepare every profile's capture rectangle; the topology drops them
+        on each layout change and does not exist yet when profiles are
+        first compiled
+        """
+        for name, merged in self.prepared.items():
+            try:
+                prepare_region(merged)
+            except Exception as e:
+                print(f"Error preparing profile {name}: {e}")
+
+    def switch(self, name):
+        """
+        Make a prepared profile the active config
+
+        Returns:
+            False if there is no such profile
+        """
+        merged = self.prepared.get(name)
+        if merged is None:
+            print(f"Unknown profile: {name}")
+            return False
+        self.active = name
+        set_active_config(merged)
+        return True
+
+
+_profiles = ProfileSet()
+add_config_listener(_profiles.compile)
+
+
+def get_profiles():
+    return _profiles
+
+
+def track_topology(topology):
+    """Prepare profile capture regions now and after every layout change"""
+    topology.subscribe(_profiles.prepare_regions)
+    _profiles.prepare_regions()
+
+
+def switch_profile(name):
+    """Switch the active profile; takes effect on the next frame"""
+    if _profiles.switch(name):
+        print(f"Switched to profile {name}")
+        return True
+    return False
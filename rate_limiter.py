@@ -0,0 +1,78 @@
+"""
+Per-bulb adaptive command rate
+AIMD controller driven by command round-trip times and errors, so each
+bulb is sent only as many updates as it can actually keep up with
+"""
+
+import math
+import time
+
+INITIAL_RATE = 5.0
+MIN_RATE = 1.0
+ADDITIVE_STEP = 0.5
+DECREASE_FACTOR = 0.5
+RTT_TOLERANCE = 2.0
+RTT_SLACK = 0.005
+DECREASE_COOLDOWN = 1.0
+
+
+class RateController:
+    """Tracks one bulb's RTT and picks the command rate for it"""
+
+    def __init__(self, max_rate=50.0, min_rate=MIN_RATE):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = min(INITIAL_RATE, max_rate)
+        self.srtt = None
+        self.min_rtt = math.inf
+        self.last_send = 0.0
+        self.last_decrease = 0.0
+        self.commands = 0
+        self.errors = 0
+
+    def set_max_rate(self, max_rate):
+        """Cap the rate, e.g. at 1 / update_delay"""
+        self.max_rate = max(max_rate, self.min_rate)
+        self.rate = min(self.rate, self.max_rate)
+
+    @property
+    def interval(self):
+        """Seconds between commands at the current rate"""
+        return 1.0 / self.rate
+
+    def delay(self, now=None):
+        """Seconds until the next command may be sent"""
+        if now is None:
+            now = time.monotonic()
+        return max(self.last_send + self.interval - now, 0.0)
+
+    def transition_ms(self, configured):
+        """
+        Transition long enough for the bulb to fade until the next command,
+        never shorter than the configured transition
+        """
+        return max(configured, int(self.interval * 1000))
+
+    def on_success(self, sent_at, rtt):
+        """Record a completed command; speed up unless RTT shows queueing"""
+        self.commands += 1
+        self.last_send = sent_at
+        self.min_rtt = min(self.min_rtt, rtt)
+        self.srtt = rtt if self.srtt is None else 0.875 * self.srtt + 0.125 * rtt
+
+        if self.srtt > self.min_rtt * RTT_TOLERANCE + RTT_SLACK:
+            self._decrease(sent_at + rtt)
+        else:
+            self.rate = min(self.rate + ADDITIVE_STEP, self.max_rate)
+
+    def on_error(self):
+        """Record a failed command; back off right away"""
+        self.errors += 1
+        self.last_decrease = 0.0
+        self._decrease(time.monotonic())
+
+    def _decrease(self, now):
+        if now - self.last_decrease < DECREASE_COOLDOWN:
+            return
+        self.last_decrease = now
+        self.rate = max(self.rate * DECREASE_FACTOR, self.min_rate)
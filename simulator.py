@@ -0,0 +1,297 @@
+"""
+Local Kasa bulb simulator
+Speaks the legacy IOT protocol (XOR "autokey" on port 9999) that
+kasa.iot.IotBulb uses, so the sync loop can run without a physical bulb.
+Each simulated bulb listens on its own loopback address (127.0.0.X).
+
+Usage:
+    python simulator.py [--count 1] [--latency 0.02] [--jitter 0.01] [--drop 0.0]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import struct
+import time
+from collections import deque
+
+PORT = 9999
+LOG_SIZE = 100_000
+LIGHT_SERVICE = "smartlife.iot.smartbulb.lightingservice"
+EMETER = "smartlife.iot.common.emeter"
+
+
+def xor_encrypt(data):
+    """Kasa autokey XOR cipher, without the length prefix"""
+    key = 171
+    out = bytearray()
+    for byte in data:
+        key ^= byte
+        out.append(key)
+    return bytes(out)
+
+
+def xor_decrypt(data):
+    key = 171
+    out = bytearray()
+    for byte in data:
+        out.append(key ^ byte)
+        key = byte
+    return bytes(out)
+
+
+class SimulatedBulb:
+    """One fake KL130-style color bulb"""
+
+    def __init__(self, host, port=PORT, latency=0.0, jitter=0.0, drop_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.verbose = False
+        self.log = deque(maxlen=LOG_SIZE)
+        self.light_state = {
+            "on_off": 1,
+            "mode": "normal",
+            "hue": 0,
+            "saturation": 0,
+            "color_temp": 0,
+            "brightness": 100,
+        }
+        self._tcp_server = None
+        self._udp_transport = None
+        self._writers = set()
+
+    def sysinfo(self):
+        last_octet = self.host.rsplit(".", 1)[-1]
+        return {
+            "sw_ver": "1.8.11 Build 191113 Rel.105336",
+            "hw_ver": "2.0",
+            "model": "KL130(EU)",
+            "description": "Smart Wi-Fi LED Bulb with Color Changing",
+            "alias": f"Simulated Bulb {last_octet}",
+            "mic_type": "IOT.SMARTBULB",
+            "dev_state": "normal",
+            "mic_mac": f"5091E3000{int(last_octet):03X}",
+            "deviceId": f"SIMULATED{int(last_octet):031d}",
+            "oemId": "0" * 32,
+            "hwId": "0" * 32,
+            "is_factory": False,
+            "disco_ver": "1.0",
+            "ctrl_protocols": {"name": "Linkie", "version": "1.0"},
+            "active_mode": "none",
+            "is_dimmable": 1,
+            "is_color": 1,
+            "is_variable_color_temp": 1,
+            "light_state": dict(self.light_state),
+            "preferred_state": [],
+            "rssi": -50,
+            "err_code": 0,
+        }
+
+    def handle(self, request):
+        """Answer a decoded IOT request dictionary"""
+        response = {}
+        for target, commands in request.items():
+            if target == "system":
+                result = {}
+                for command in commands:
+                    if command == "get_sysinfo":
+                        result[command] = self.sysinfo()
+                    else:
+                        result[command] = {"err_code": 0}
+                response[target] = result
+            elif target == LIGHT_SERVICE:
+                result = {}
+                for command, params in commands.items():
+                    if command == "transition_light_state":
+                        self.light_state.update(
+                            {
+                                k: v
+                                for k, v in params.items()
+                                if k != "transition_period"
+                            }
+                        )
+                        self.light_state["mode"] = "normal"
+                        result[command] = dict(self.light_state, err_code=0)
+                    elif command == "get_light_state":
+                        result[command] = dict(self.light_state, err_code=0)
+                    else:
+                        result[command] = {
+                            "err_code": -2,
+                            "err_msg": "member not support",
+                        }
+                response[target] = result
+            elif target == EMETER:
+                response[target] = {
+                    command: (
+                        {"power_mw": 1800 * self.light_state["on_off"], "err_code": 0}
+                        if command == "get_realtime"
+                        else {"day_list": [], "month_list": [], "err_code": 0}
+                    )
+                    for command in commands
+                }
+            else:
+                response[target] = {"err_code": -1, "err_msg": "module not support"}
+        return response
+
+    def _record(self, request):
+        now = time.time()
+        for target, commands in request.items():
+            for command, params in commands.items():
+                self.log.append((now, command, params))
+                if self.verbose:
+                    print(
+                        f"{now:.6f} {self.host} {target}.{command} {json.dumps(params)}"
+                    )
+
+    async def _handle_tcp(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(4)
+                (length,) = struct.unpack(">I", header)
+                request = json.loads(xor_decrypt(await reader.readexactly(length)))
+                self._record(request)
+
+                delay = self.latency + random.uniform(-self.jitter, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if random.random() < self.drop_rate:
+                    break
+
+                payload = xor_encrypt(json.dumps(self.handle(request)).encode())
+                writer.write(struct.pack(">I", len(payload)) + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def start(self):
+        """Start the TCP command server and the UDP discovery responder"""
+        self._tcp_server = await asyncio.start_server(
+            self._handle_tcp, self.host, self.port
+        )
+        loop = asyncio.get_running_loop()
+        self._udp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DiscoveryProtocol(self), local_addr=(self.host, self.port)
+        )
+
+    async def stop(self):
+        if self._udp_transport:
+            self._udp_transport.close()
+        for writer in list(self._writers):
+            writer.close()
+        if self._tcp_server:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    """Answers legacy discovery datagrams with the bulb's sysinfo"""
+
+    def __init__(self, bulb):
+        self.bulb = bulb
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            request = json.loads(xor_decrypt(data))
+        except ValueError:
+            return
+        self.bulb._record(request)
+        response = {"system": {"get_sysinfo": self.bulb.sysinfo()}}
+        self.transport.sendto(xor_encrypt(json.dumps(response).encode()), addr)
+
+
+def simulator_hosts(count):
+    """Loopback addresses for count simulated bulbs"""
+    return [f"127.0.0.{i}" for i in range(1, count + 1)]
+
+
+async def run_simulators(
+    count, latency=0.0, jitter=0.0, drop_rate=0.0, verbose=True, until=None
+):
+    """
+    Run count simulated bulbs until cancelled or until the until() coroutine
+    returns
+
+    Returns:
+        List of SimulatedBulb instances, with their command logs
+    """
+    bulbs = [
+        SimulatedBulb(host, latency=latency, jitter=jitter, drop_rate=drop_rate)
+        for host in simulator_hosts(count)
+    ]
+    for bulb in bulbs:
+        bulb.verbose = verbose
+        await bulb.start()
+        if verbose:
+            print(f"Simulated bulb listening on {bulb.host}:{bulb.port}")
+
+    try:
+        if until is None:
+            await asyncio.Event().wait()
+        else:
+            await until()
+    finally:
+        for bulb in bulbs:
+            await bulb.stop()
+    return bulbs
+
+
+def simulator_process(count, latency, jitter, drop_rate, conn):
+    """
+    Run simulated bulbs in a child process for benchmarks
+
+    Sends "ready" over the pipe once listening, runs until anything is
+    received, then sends back the receive times of every
+    transition_light_state per host and the simulator's own CPU time.
+    """
+
+    async def until():
+        conn.send("ready")
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+
+    bulbs = asyncio.run(
+        run_simulators(count, latency, jitter, drop_rate, verbose=False, until=until)
+    )
+    conn.send(
+        {
+            "commands": {
+                bulb.host: [
+                    ts
+                    for ts, command, _ in bulb.log
+                    if command == "transition_light_state"
+                ]
+                for bulb in bulbs
+            },
+            "cpu": time.process_time(),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Kasa bulb simulator")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_simulators(args.count, args.latency, args.jitter, args.drop))
+    except KeyboardInterrupt:
+        print("\n👋 Bye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Soak test
+Runs the app's own sync loop (main.run_iteration, governed like
+main.main) for hours at an accelerated frame rate, on synthetic frames and
+against a simulated bulb. Every interval it
+records traced Python memory, RSS, open file descriptors and latency
+percentiles, then fails if any of them trends upwards faster than the
+given limits and lists the allocation sites that grew the most.
+
+Usage:
+    python soak.py [--hours 4] [--interval 60] [--delay 0.005]
+    python soak.py --hours 0.05 --interval 10 --leak 4096   # self-check
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+import numpy as np
+from main import stats
+from config import load_config, get_config
+from bulb import discover_bulb
+from supervisor import BulbSupervisor
+from simulator import simulator_hosts, simulator_process
+from color_utils import get_average_color_fast
+from procstats import rss_bytes, format_bytes
+from benchmark import SyntheticScreen, make_scene, drive_engine
+
+TRACE_DEPTH = 1
+# A trend also has to add up to more than this over the run to fail, so
+# allocator and scheduler noise in short runs is not extrapolated per hour
+NOISE_FLOOR = {"traced": 512 * 1024, "rss": 4 * 2**20, "fds": 2, "p95": 1.0}
+# Latency moves with scheduling, so its floor also scales with its level
+RELATIVE_NOISE_FLOOR = {"p95": 0.25}
+IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>")
+
+
+def open_fds():
+    """Number of open file descriptors, or None where /proc is missing"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def percentiles(values):
+    """p50, p95 and p99 of latencies in ms"""
+    if not values:
+        return 0.0, 0.0, 0.0
+    return tuple(np.percentile(values, [50, 95, 99]))
+
+
+class SoakRecorder:
+    """Per-interval samples of memory, descriptors and latency"""
+
+    def __init__(self, warmup):
+        self.warmup = warmup
+        self.samples = []
+        self.baseline = None
+        self.snapshot = None
+        self.iterations = 0
+        self.started = time.monotonic()
+        self.window_start = self.started
+
+    def sample(self):
+        """Close the current interval and print one line for it"""
+        now = time.monotonic()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, name) for name in IGNORED_FILES]
+        )
+        traced = sum(stat.size for stat in snapshot.statistics("filename"))
+        # Every send of the interval, drained from the engine's latency deques
+        latency = stats["latency"]
+        p50, p95, p99 = percentiles(list(latency["normal"]) + list(latency["cut"]))
+        latency["normal"].clear()
+        latency["cut"].clear()
+        sample = {
+            "hours": (now - self.started) / 3600,
+            "fps": self.iterations / (now - self.window_start),
+            "traced": traced,
+            "rss": rss_bytes(),
+            "fds": open_fds(),
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+        self.samples.append(sample)
+        self.iterations = 0
+        self.window_start = time.monotonic()
+
+        # Growth is measured from the end of the warmup, once caches are full
+        if len(self.samples) == self.warmup:
+            self.baseline = snapshot
+        self.snapshot = snapshot
+
+        print(
+            f"{sample['hours'] * 60:7.1f} min  {sample['fps']:6.0f} fps  "
+            f"traced {format_bytes(traced):>9}  rss {format_bytes(sample['rss']):>9}  "
+            f"fds {sample['fds'] if sample['fds'] is not None else '-':>4}  "
+            f"latency p50 {p50:6.2f}  p95 {p95:6.2f}  p99 {p99:6.2f} ms",
+            flush=True,
+        )
+
+    def trend(self, key):
+        """
+        Least-squares slope of a sampled value per hour after the warmup
+
+        Returns:
+            (slope, fitted growth over the run), or None with fewer than
+            three samples to fit
+        """
+        points = [
+            (s["hours"], s[key])
+            for s in self.samples[self.warmup :]
+            if s[key] is not None
+        ]
+        if len(points) < 3:
+            return None
+        hours, values = np.array(points, dtype=float).T
+        slope = float(np.polyfit(hours, values, 1)[0])
+        return slope, slope * (hours[-1] - hours[0])
+
+    def level(self, key):
+        """Median of a sampled value after the warmup"""
+        values = [s[key] for s in self.samples[self.warmup :] if s[key] is not None]
+        return float(np.median(values)) if values else 0.0
+
+    def growth_sites(self, top):
+        """Allocation sites that grew the most since the warmup"""
+        if self.baseline is None or self.snapshot is self.baseline:
+            return []
+        diffs = self.snapshot.compare_to(self.baseline, "lineno")
+        return [stat for stat in diffs if stat.size_diff > 0][:top]
+
+
+async def run_engine(supervisor, recorder, args):
+    """Drive main.run_iteration with synthetic frames, sampling every interval"""
+    screen = SyntheticScreen(make_scene(args.width, args.height))
+    scenes = [make_scene(args.width, args.height, seed) for seed in range(8)]
+    get_config()["capture"]["update_delay"] = args.delay
+    # Unbounded so each interval's percentiles cover all of its sends
+    stats["latency"]["normal"], stats["latency"]["cut"] = deque(), deque()
+    leaked = []
+    frame = 0
+    next_sample = time.monotonic() + args.interval
+
+    def after_frame():
+        nonlocal frame, next_sample
+        frame += 1
+        screen.frame = scenes[frame // args.scene % len(scenes)]
+        if args.leak:
+            leaked.append(bytearray(args.leak))
+        recorder.iterations += 1
+        if time.monotonic() >= next_sample:
+            recorder.sample()
+            next_sample += args.interval
+
+    await drive_engine(screen, supervisor, args.hours * 3600, after_frame)
+
+
+async def soak(host, recorder, args):
+    supervisor = BulbSupervisor(lambda: discover_bulb(host))
+    task = asyncio.create_task(supervisor.run())
+    try:
+        await run_engine(supervisor, recorder, args)
+    finally:
+        task.cancel()
+        if supervisor.bulb:
+            await supervisor.bulb.disconnect()
+    return supervisor
+
+
+def report(recorder, supervisor, args):
+    """
+    Print the trends and growth sites
+
+    Returns:
+        True if every trend is within its limit
+    """
+    limits = (
+        ("traced", "traced memory", args.max_traced_growth * 2**20, format_bytes),
+        ("rss", "RSS", args.max_rss_growth * 2**20, format_bytes),
+        ("fds", "open fds", args.max_fd_growth, lambda v: f"{v:.1f}"),
+        ("p95", "p95 latency", args.max_latency_growth, lambda v: f"{v:.2f} ms"),
+    )
+    print(
+        f"\n{len(recorder.samples)} samples, {supervisor.reconnects} reconnects, "
+        f"{supervisor.rate.errors} send errors"
+    )
+    ok = True
+    for key, name, limit, fmt in limits:
+        trend = recorder.trend(key)
+        if trend is None:
+            print(f"  {name:14} not enough samples after warmup")
+            continue
+        slope, growth = trend
+        floor = max(
+            NOISE_FLOOR[key], RELATIVE_NOISE_FLOOR.get(key, 0) * recorder.level(key)
+        )
+        passed = slope <= limit or growth <= floor
+        ok &= passed
+        print(
+            f"  {name:14} {fmt(slope):>10}/h  (limit {fmt(limit)}/h, "
+            f"{fmt(growth)} over the run)  {'OK' if passed else 'FAIL'}"
+        )
+
+    sites = recorder.growth_sites(args.top)
+    if sites:
+        print(f"\nTop {len(sites)} allocation growth sites since warmup:")
+        for stat in sites:
+            frame = stat.traceback[0]
+            print(
+                f"  {format_bytes(stat.size_diff):>9} in {stat.count_diff:+d} blocks  "
+                f"{frame.filename}:{frame.lineno}"
+            )
+    return ok
+
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running soak test")
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds")
+    parser.add_argument("--warmup", type=int, default=2, help="samples to skip")
+    parser.add_argument("--delay", type=float, default=0.005, help="frame delay")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080))
+    parser.add_argument("--scene", type=int, default=240, help="frames per scene")
+    parser.add_argument("--latency", type=float, default=0.005, help="bulb RTT")
+    parser.add_argument("--drop", type=float, default=0.0)
+    parser.add_argument("--max-traced-growth", type=float, default=1.0, help="MB/h")
+    parser.add_argument("--max-rss-growth", type=float, default=8.0, help="MB/h")
+    parser.add_argument("--max-fd-growth", type=float, default=1.0, help="per hour")
+    parser.add_argument("--max-latency-growth", type=float, default=2.0, help="ms/h")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--leak", type=int, default=0, help="bytes leaked per frame")
+    args = parser.parse_args()
+    args.width, args.height = args.size
+
+    load_config()
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=simulator_process,
+        args=(1, args.latency, args.latency / 4, args.drop, child),
+        daemon=True,
+    )
+    process.start()
+    parent.recv()
+
+    # Compile kernels and fill caches before tracing starts
+    get_average_color_fast(SyntheticScreen(make_scene(args.width, args.height)), 1)
+    print(
+        f"Soak test: {args.hours}h, sample every {args.interval:.0f}s, "
+        f"frame delay {args.delay * 1000:.1f} ms, {args.width}x{args.height}"
+    )
+    tracemalloc.start(TRACE_DEPTH)
+    recorder = SoakRecorder(args.warmup)
+    try:
+        supervisor = asyncio.run(soak(simulator_hosts(1)[0], recorder, args))
+    finally:
+        tracemalloc.stop()
+        parent.send("stop")
+        parent.recv()
+        process.join()
+
+    if not report(recorder, supervisor, args):
+        print("\nFAIL")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Bulb connection supervisor
+Keeps (re)discovering the bulb in a background task so the capture loop
+never blocks on discovery while the bulb is offline
+"""
+
+import asyncio
+import random
+import time
+from bulb import discover_bulb
+from rate_limiter import RateController
+from tracing import span, instant
+
+INITIAL_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+class BulbSupervisor:
+    """Owns the bulb connection and reconnects with exponential backoff"""
+
+    def __init__(self, discover=discover_bulb):
+        self.discover = discover
+        self.bulb = None
+        self.dropped = None
+        self.ever_connected = False
+        self.reconnects = 0
+        self.attempts = 0
+        self.downtime = 0.0
+        self.offline_since = time.monotonic()
+        self.last_error = None
+        self.rate = RateController()
+        self._lost = asyncio.Event()
+        self._lost.set()
+        self._connected = asyncio.Event()
+
+    @property
+    def online(self):
+        return self.bulb is not None
+
+    def current_downtime(self):
+        """Total seconds spent offline, including the current outage"""
+        if self.online or not self.ever_connected:
+            return self.downtime
+        return self.downtime + time.monotonic() - self.offline_since
+
+    async def run(self):
+        """Supervisor task: wait for a lost connection, then rediscover"""
+        while True:
+            await self._lost.wait()
+            await self._disconnect_dropped()
+            with span("reconnect", "bulb", track="supervisor"):
+                await self._reconnect()
+
+    async def _disconnect_dropped(self):
+        """Close the transport of the bulb given up by mark_lost"""
+        bulb, self.dropped = self.dropped, None
+        if bulb is None:
+            return
+        try:
+            await bulb.disconnect()
+        except Exception:
+            # The connection is already broken, there is nothing to recover
+            pass
+
+    async def _reconnect(self):
+        backoff = INITIAL_BACKOFF
+        while True:
+            self.attempts += 1
+            bulb = await self.discover()
+            if bulb:
+                break
+
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            print(f"Bulb offline, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+        if self.ever_connected:
+            outage = time.monotonic() - self.offline_since
+            self.downtime += outage
+            self.reconnects += 1
+            print(f"Bulb reconnected after {outage:.1f}s offline")
+        self.ever_connected = True
+        self.attempts = 0
+        self.bulb = bulb
+        self._lost.clear()
+        self._connected.set()
+
+    async def wait_connected(self, timeout=None):
+        """Wait until a bulb is connected, returns False on timeout"""
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def mark_lost(self, error):
+        """
+        Drop the current bulb and wake the supervisor, which disconnects
+        it before rediscovering
+        """
+        if not self.online:
+            return
+        print(f"Connection lost: {error}")
+        instant("connection_lost", "bulb", {"error": str(error)})
+        self.last_error = str(error)
+        self.dropped = self.bulb
+        self.bulb = None
+        self.offline_since = time.monotonic()
+        self._connected.clear()
+        self._lost.set()
+
+    async def set_hsv(self, h, s, v, transition):
+        """
+        Send a color to the bulb if it is connected
+
+        Returns:
+            True if the command was sent, False while offline or on error
+        """
+        bulb = self.bulb
+        if bulb is None:
+            return False
+
+        sent_at = time.monotonic()
+        try:
+            light = bulb.modules.get("Light")
+            if light:
+                await light.set_hsv(h, s, v, transition=transition)
+        except Exception as e:
+            self.rate.on_error()
+            self.mark_lost(e)
+            return False
+
+        self.rate.on_success(sent_at, time.monotonic() - sent_at)
+        return True
@@ -0,0 +1,24 @@
+"""
+Per-frame allocation check for the NumPy weighted mean, the same
+measurement as "python benchmark.py allocations" run under pytest
+"""
+
+import os
+import pytest
+from config import load_config, get_config
+from benchmark import downsampled, make_frame, peak_frame_allocation
+
+FRAMES = 200
+LIMIT = 4096
+
+
+@pytest.mark.parametrize("width, height", [(1920, 1080), (3840, 2160)])
+def test_weighted_mean_does_not_allocate_per_frame(width, height, monkeypatch):
+    # bulb_config.json is looked up in the working directory
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    load_config()
+    frames = [downsampled(make_frame(width, height, seed)) for seed in range(4)]
+
+    worst = peak_frame_allocation(frames, get_config(), FRAMES)
+
+    assert worst <= LIMIT, f"{worst} bytes allocated in one frame"
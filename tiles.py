@@ -0,0 +1,75 @@
+"""
+Sparse tile sampling
+Grabs a few small tiles spread over the capture region instead of the
+whole region, and stacks them into one frame for the color pipeline
+"""
+
+import numpy as np
+
+
+class TileSampler:
+    """Places tiles on a grid, optionally jittered inside each cell per frame"""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.buffer = None
+
+    def regions(self, region, tiles_x, tiles_y, size, layout):
+        """
+        Tile rectangles for one frame
+
+        Args:
+            region: Capture rectangle to spread the tiles over
+            tiles_x, tiles_y: Grid dimensions, one tile per cell
+            size: Tile edge length in pixels, shrunk to fit a cell
+            layout: "grid" for cell centers, "stratified" for a random
+                position inside each cell that changes every frame
+        """
+        cell_w = region["width"] // tiles_x
+        cell_h = region["height"] // tiles_y
+        size = max(min(size, cell_w, cell_h), 1)
+
+        if layout == "stratified":
+            offset_x = self.rng.integers(0, cell_w - size + 1, size=(tiles_y, tiles_x))
+            offset_y = self.rng.integers(0, cell_h - size + 1, size=(tiles_y, tiles_x))
+        else:
+            offset_x = np.full((tiles_y, tiles_x), (cell_w - size) // 2)
+            offset_y = np.full((tiles_y, tiles_x), (cell_h - size) // 2)
+
+        return [
+            {
+                "left": region["left"] + col * cell_w + int(offset_x[row, col]),
+                "top": region["top"] + row * cell_h + int(offset_y[row, col]),
+                "width": size,
+                "height": size,
+            }
+            for row in range(tiles_y)
+            for col in range(tiles_x)
+        ]
+
+    def grab(self, sct, regions):
+        """Grab every tile into one (tiles * size, size, 4) BGRA frame"""
+        size = regions[0]["width"]
+        shape = (len(regions) * size, size, 4)
+        if self.buffer is None or self.buffer.shape != shape:
+            self.buffer = np.empty(shape, dtype=np.uint8)
+
+        for i, tile in enumerate(regions):
+            self.buffer[i * size : (i + 1) * size] = np.asarray(sct.grab(tile))
+        return self.buffer
+
+
+_sampler = TileSampler()
+
+
+def grab_tiles(sct, region, config):
+    """Grab the configured tiles of a capture region as one BGRA frame"""
+    capture = config["capture"]
+    regions = _sampler.regions(
+        region,
+        capture.get("tiles_x", 8),
+        capture.get("tiles_y", 6),
+        capture.get("tile_size", 16),
+        capture.get("tile_layout", "stratified"),
+    )
+    return _sampler.grab(sct, regions)
@@ -0,0 +1,193 @@
+"""
+Shared monitor topology
+Enumerates monitors once, caches capture rectangles derived from them and
+watches for layout changes (XRandR events on X11, a cheap poll elsewhere).
+Subscribers are only notified when the layout actually changes.
+"""
+
+import os
+import select
+import threading
+import mss
+
+try:
+    from Xlib import display as xdisplay
+    from Xlib.ext import randr
+
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+POLL_INTERVAL = 2.0
+
+
+def enumerate_monitors():
+    """Current monitor rectangles, in mss order (0 is the whole desktop)"""
+    with mss.mss() as sct:
+        return [
+            {
+                "left": m["left"],
+                "top": m["top"],
+                "width": m["width"],
+                "height": m["height"],
+            }
+            for m in sct.monitors
+        ]
+
+
+class MonitorTopology:
+    """Cached monitor layout with change notification"""
+
+    def __init__(self, enumerate=enumerate_monitors, poll_interval=POLL_INTERVAL):
+        self.enumerate = enumerate
+        self.poll_interval = poll_interval
+        self.monitors = enumerate()
+        self.version = 1
+        self._derived = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._warned = None
+
+    def monitors_info(self):
+        """Physical monitors with their mss index, for the GUI"""
+        return [
+            dict(monitor, index=i)
+            for i, monitor in enumerate(self.monitors[1:], start=1)
+        ]
+
+    def monitor(self, index):
+        """
+        Monitor rectangle for an mss index, falling back to the primary
+        monitor if the index no longer exists (e.g. after unplugging)
+        """
+        monitors = self.monitors
+        if 0 <= index < len(monitors):
+            return monitors[index]
+        if self._warned != (index, self.version):
+            self._warned = (index, self.version)
+            print(f"Monitor {index} not connected, capturing monitor 1")
+        return monitors[1] if len(monitors) > 1 else monitors[0]
+
+    def cached(self, key, build):
+        """
+        Geometry derived from the layout (e.g. a capture rectangle), built
+        once with build() and kept until the layout changes
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = self._derived[key] = build()
+        return value
+
+    def subscribe(self, callback):
+        """Call callback(topology) from the watcher thread after each change"""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        """
+        Re-enumerate monitors and notify subscribers if the layout changed
+
+        Returns:
+            True if the layout changed
+        """
+        try:
+            monitors = self.enumerate()
+        except Exception as e:
+            print(f"Error getting monitors: {e}")
+            return False
+
+        with self._lock:
+            if monitors == self.monitors:
+                return False
+            self.monitors = monitors
+            self._derived = {}
+            self.version += 1
+
+        print(f"Monitor layout changed: {len(monitors) - 1} monitor(s)")
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in topology listener: {e}")
+        return True
+
+    def start(self):
+        """Start watching for layout changes in a daemon thread"""
+        if self._thread is not None:
+            return
+        target = self._watch_poll
+        if XLIB_AVAILABLE and os.environ.get("DISPLAY"):
+            target = self._watch_randr
+        self._thread = threading.Thread(target=target, name="topology", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_poll(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def _watch_randr(self):
+        try:
+            conn = xdisplay.Display()
+            if not conn.has_extension("RANDR"):
+                conn.close()
+                raise RuntimeError("X server has no RANDR extension")
+            conn.screen().root.xrandr_select_input(
+                randr.RRScreenChangeNotifyMask
+                | randr.RRCrtcChangeNotifyMask
+                | randr.RROutputChangeNotifyMask
+            )
+            conn.flush()
+        except Exception as e:
+            print(f"XRandR unavailable ({e}), polling monitor layout")
+            return self._watch_poll()
+
+        try:
+            while not self._stop.is_set():
+                # Wait with a timeout instead of in next_event(), so stop()
+                # takes effect
+                select.select([conn], [], [], self.poll_interval)
+                if not conn.pending_events():
+                    continue
+                # A hot-plug arrives as a burst of events; drain it before refreshing
+                while conn.pending_events():
+                    conn.next_event()
+                self.refresh()
+        finally:
+            conn.close()
+
+
+_topology = None
+
+
+def get_topology():
+    """Get the shared topology, enumerating monitors on first use"""
+    global _topology
+    if _topology is None:
+        _topology = MonitorTopology()
+    return _topology
+
+
+def start_topology():
+    """Create the shared topology and start watching for changes"""
+    topology = get_topology()
+    topology.start()
+    return topology
+
+
+def current_topology():
+    """The shared topology if it has been created, else None"""
+    return _topology
+
+
+def monitor_rect(sct, monitor_index):
+    """
+    Monitor rectangle from the shared topology once it exists, otherwise
+    straight from the given mss-like instance (benchmarks, tools)
+    """
+    if _topology is None:
+        return sct.monitors[monitor_index]
+    return _topology.monitor(monitor_index)
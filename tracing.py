@@ -0,0 +1,195 @@
+"""
+Opt-in span tracing
+Records timed spans of the sync loop, GUI callbacks, config reloads and
+reconnects into a bounded in-memory ring, and dumps them as a Chrome Trace
+Event JSON file that opens in Perfetto (ui.perfetto.dev) or chrome://tracing.
+While tracing is off, span() returns a shared no-op context manager.
+
+Spans on one thread must nest. Spans of an asyncio task that stay open
+across awaits while other tasks run (e.g. reconnects) should pass a track
+name so they are drawn on their own row instead of the thread's.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+DEFAULT_CAPACITY = 100_000
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "track", "start")
+
+    def __init__(self, tracer, name, cat, args, track=None):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.track = track
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.tracer.events.append(
+            (
+                "X",
+                self.name,
+                self.cat,
+                self.start,
+                end - self.start,
+                self.track or threading.get_ident(),
+                self.args,
+            )
+        )
+        return False
+
+
+class Tracer:
+    """Bounded ring of completed spans and instant events"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+
+    def enable(self, capacity=None):
+        if capacity and capacity != self.events.maxlen:
+            self.events = deque(self.events, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, cat="loop", args=None, track=None):
+        """Context manager timing one span; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, cat, args, track)
+
+    def instant(self, name, cat="loop", args=None):
+        """Record a zero-length marker"""
+        if self.enabled:
+            self.events.append(
+                ("i", name, cat, time.perf_counter(), 0, threading.get_ident(), args)
+            )
+
+    def to_chrome(self):
+        """Recorded events in Chrome Trace Event format"""
+        pid = os.getpid()
+        events = list(self.events)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        tids = {}
+        for track in {event[5] for event in events}:
+            if isinstance(track, str):
+                names[track] = track
+                tids[track] = len(tids) + 1
+            else:
+                tids[track] = track
+
+        trace = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": names.get(track, f"thread-{tid}")},
+            }
+            for track, tid in tids.items()
+        ]
+        for ph, name, cat, start, duration, track, args in events:
+            tid = tids[track]
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": ph,
+                "ts": start * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            if ph == "X":
+                event["dur"] = duration * 1e6
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def dump(self, path=None):
+        """
+        Write the ring to a trace file
+
+        Returns:
+            Path of the written file
+        """
+        if path is None:
+            path = f"trace-{datetime.now():%Y%m%d-%H%M%S}.json"
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f)
+        return path
+
+
+tracer = Tracer()
+
+
+def span(name, cat="loop", args=None, track=None):
+    """Time a block with the global tracer"""
+    return tracer.span(name, cat, args, track)
+
+
+def instant(name, cat="loop", args=None):
+    tracer.instant(name, cat, args)
+
+
+def traced(name=None, cat="gui"):
+    """Decorator recording every call of a function as a span"""
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, span_name, cat, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(config, force=False):
+    """Enable or disable tracing from the "tracing" config section"""
+    section = config.get("tracing", {})
+    if force or section.get("enabled", 0):
+        tracer.enable(section.get("capacity", DEFAULT_CAPACITY))
+    else:
+        tracer.disable()
+
+
+def dump_trace(path=None):
+    """
+    Dump the trace ring if tracing is enabled
+
+    Returns:
+        Path of the written file, or None
+    """
+    if not tracer.enabled:
+        print("Tracing is off; set tracing.enabled or start with --trace")
+        return None
+    try:
+        path = tracer.dump(path)
+        print(f"Trace written to {path} ({len(tracer.events)} events)")
+        return path
+    except Exception as e:
+        print(f"Error writing trace: {e}")
+        return None
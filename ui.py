@@ -1,6 +1,8 @@
+import tkinter as tk
 import customtkinter as ctk
 from config import config
 from icons import Icons, load_icon
+from preview import get_preview
 
 COLORS = {
     "bg": "#0a0a0a",
@@ -19,8 +21,14 @@ COLORS = {
 }
 
 
-def build_settings_tab(parent, entries):
-    """Build the settings tab with scrollable configuration"""
+def build_settings_tab(parent, entries, profile=None):
+    """
+    Build the settings tab with scrollable configuration
+
+    Args:
+        profile: (name, overrides) of the active profile; keys it overrides
+            show and edit the profile's value instead of the base one
+    """
     scroll_frame = ctk.CTkScrollableFrame(
         parent,
         fg_color="transparent",
@@ -29,15 +37,27 @@ def build_settings_tab(parent, entries):
     scroll_frame.pack(fill="both", expand=True)
 
     sections = [
-        ("Color Boosts", config["color_boosts"], "palette"),
-        ("Weighting", config["weighting"], "sliders"),
-        ("HSV Adjustments", config["hsv_adjustments"], "adjust"),
-        ("Hue Adjustments", config["hue_adjustments"], "droplet"),
-        ("Capture Settings", config["capture"], "monitor"),
+        ("Color Boosts", "color_boosts", "palette"),
+        ("Weighting", "weighting", "sliders"),
+        ("HSV Adjustments", "hsv_adjustments", "adjust"),
+        ("Hue Adjustments", "hue_adjustments", "droplet"),
+        ("Capture Settings", "capture", "monitor"),
     ]
 
-    for title, data_dict, icon_name in sections:
-        build_section(scroll_frame, title, data_dict, entries, icon_name)
+    profile_name, overrides = profile or (None, {})
+    for title, section, icon_name in sections:
+        section_overrides = overrides.get(section)
+        if not isinstance(section_overrides, dict):
+            section_overrides = {}
+        build_section(
+            scroll_frame,
+            title,
+            config[section],
+            entries,
+            icon_name,
+            profile_name,
+            section_overrides,
+        )
 
 
 def build_monitor_tab(
@@ -116,7 +136,15 @@ def build_monitor_tab(
     return monitor_buttons
 
 
-def build_section(parent, title, data_dict, entries, icon_name=None):
+def build_section(
+    parent,
+    title,
+    data_dict,
+    entries,
+    icon_name=None,
+    profile_name=None,
+    overrides=None,
+):
     """Build a configuration section with optional icon"""
     section_frame = ctk.CTkFrame(parent, fg_color=COLORS["bg"], corner_radius=12)
     section_frame.pack(fill="x", padx=15, pady=10)
@@ -141,11 +169,19 @@ def build_section(parent, title, data_dict, entries, icon_name=None):
         row_frame = ctk.CTkFrame(section_frame, fg_color="transparent")
         row_frame.pack(fill="x", padx=15, pady=5)
 
+        # Edits go where the engine reads them: the profile's override if any
+        target = data_dict
+        label_text = format_label(key)
+        if overrides and key in overrides:
+            target = overrides
+            value = overrides[key]
+            label_text += f" ({profile_name})"
+
         label = ctk.CTkLabel(
             row_frame,
-            text=format_label(key),
+            text=label_text,
             font=("Segoe UI", 13),
-            text_color=COLORS["text_dim"],
+            text_color=COLORS["text"] if target is overrides else COLORS["text_dim"],
             anchor="w",
         )
         label.pack(side="left", fill="x", expand=True)
@@ -161,7 +197,7 @@ def build_section(parent, title, data_dict, entries, icon_name=None):
         entry.insert(0, str(value))
         entry.pack(side="right", padx=(10, 0))
 
-        entries[f"{title}.{key}"] = (entry, data_dict, key)
+        entries[f"{title}.{key}"] = (entry, target, key)
 
     ctk.CTkLabel(section_frame, text="", height=10).pack()
 
@@ -320,6 +356,42 @@ def build_debug_tab(parent):
     )
     hex_label.pack(anchor="w", pady=2)
 
+    preview_section = ctk.CTkFrame(
+        scroll_frame, fg_color=COLORS["bg"], corner_radius=12
+    )
+    preview_section.pack(fill="x", pady=(0, 15))
+
+    preview_header = ctk.CTkLabel(
+        preview_section,
+        text="Capture Preview",
+        font=("Segoe UI", 18, "bold"),
+        text_color=COLORS["text"],
+        anchor="w",
+    )
+    preview_header.pack(fill="x", padx=15, pady=(15, 10))
+
+    # Plain Tk label: the thumbnail PhotoImage is updated in place
+    preview_label = tk.Label(preview_section, bg=COLORS["bg"], bd=0)
+    preview_label.pack(anchor="w", padx=15)
+
+    preview_weights_var = ctk.BooleanVar(value=get_preview().show_weights)
+
+    def toggle_preview_weights():
+        get_preview().set_show_weights(preview_weights_var.get())
+
+    preview_weights_check = ctk.CTkCheckBox(
+        preview_section,
+        text="Show Weights",
+        variable=preview_weights_var,
+        command=toggle_preview_weights,
+        font=("Segoe UI", 13),
+        text_color=COLORS["text_dim"],
+        fg_color=COLORS["accent"],
+        hover_color=COLORS["accent_hover"],
+        corner_radius=8,
+    )
+    preview_weights_check.pack(anchor="w", padx=15, pady=(10, 15))
+
     stats_section = ctk.CTkFrame(scroll_frame, fg_color=COLORS["bg"], corner_radius=12)
     stats_section.pack(fill="x", pady=(0, 15))
 
@@ -361,8 +433,16 @@ def build_debug_tab(parent):
 
     fps_value = create_stat_item(stats_grid, "FPS:", "0")
     update_rate_value = create_stat_item(stats_grid, "Update Rate:", "0 ms")
+    cpu_value = create_stat_item(stats_grid, "CPU:", "-")
+    power_mode_value = create_stat_item(stats_grid, "Power Mode:", "-")
     captures_value = create_stat_item(stats_grid, "Total Captures:", "0")
     uptime_value = create_stat_item(stats_grid, "Uptime:", "00:00:00")
+    bulb_value = create_stat_item(stats_grid, "Bulb:", "Offline")
+    reconnects_value = create_stat_item(stats_grid, "Reconnects:", "0")
+    downtime_value = create_stat_item(stats_grid, "Downtime:", "00:00:00")
+    send_rate_value = create_stat_item(stats_grid, "Send Rate:", "0.0 Hz")
+    downsample_value = create_stat_item(stats_grid, "Downsample:", "-")
+    latency_value = create_stat_item(stats_grid, "Latency:", "-")
 
     system_section = ctk.CTkFrame(scroll_frame, fg_color=COLORS["bg"], corner_radius=12)
     system_section.pack(fill="x", pady=(0, 15))
@@ -381,16 +461,27 @@ def build_debug_tab(parent):
 
     monitor_value = create_stat_item(system_grid, "Active Monitor:", "1")
     resolution_value = create_stat_item(system_grid, "Resolution:", "0×0")
+    memory_value = create_stat_item(system_grid, "Memory (RSS):", "n/a")
 
     return {
         "color_preview": color_preview,
         "rgb_label": rgb_label,
         "hsv_label": hsv_label,
         "hex_label": hex_label,
+        "preview_label": preview_label,
         "fps_value": fps_value,
         "update_rate_value": update_rate_value,
+        "cpu_value": cpu_value,
+        "power_mode_value": power_mode_value,
         "captures_value": captures_value,
         "uptime_value": uptime_value,
+        "bulb_value": bulb_value,
+        "reconnects_value": reconnects_value,
+        "downtime_value": downtime_value,
+        "memory_value": memory_value,
+        "downsample_value": downsample_value,
+        "latency_value": latency_value,
+        "send_rate_value": send_rate_value,
         "monitor_value": monitor_value,
         "resolution_value": resolution_value,
     }
@@ -0,0 +1,145 @@
+"""
+Preallocated scratch buffers for the color pipeline
+Every NumPy step writes into these with out= so a steady stream of frames
+with the same geometry does not allocate any new arrays
+"""
+
+import numpy as np
+
+
+class ColorWorkspace:
+    """Scratch arrays for weighting colors of one fixed shape"""
+
+    def __init__(self, shape):
+        """
+        Args:
+            shape: Leading shape of the colors, e.g. (height, width) for a
+                frame or (bins,) for a histogram
+        """
+        self.shape = tuple(shape)
+        color_shape = self.shape + (3,)
+
+        self.rgb = np.empty(color_shape, dtype=np.float32)
+        self.norm = np.empty(color_shape, dtype=np.float32)
+
+        self.max_rgb = np.empty(self.shape, dtype=np.float32)
+        self.min_rgb = np.empty(self.shape, dtype=np.float32)
+        self.diff = np.empty(self.shape, dtype=np.float32)
+        self.saturation = np.empty(self.shape, dtype=np.float32)
+        self.hue = np.empty(self.shape, dtype=np.float32)
+        self.luminance = np.empty(self.shape, dtype=np.float32)
+        self.weight = np.empty(self.shape, dtype=np.float32)
+        self.tmp = np.empty(self.shape, dtype=np.float32)
+
+        self.valid = np.empty(self.shape, dtype=bool)
+        self.mask = np.empty(self.shape, dtype=bool)
+
+        self.sums = np.empty(3, dtype=np.float32)
+
+    def load_bgra(self, frame):
+        """Copy a BGRA uint8 frame into the RGB float buffer"""
+        np.copyto(self.rgb, frame[..., 2::-1], casting="unsafe")
+
+    def weigh(self, config):
+        """
+        Apply color boosts, hue adjustments and saturation/luminance weighting
+        to self.rgb in place and fill self.weight
+
+        Returns:
+            Tuple of (adjusted colors, per-color weight), both workspace views
+        """
+        rgb = self.rgb
+        r_out, g_out, b_out = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+        boosts = config["color_boosts"]
+        r_out *= boosts["red"]
+        g_out *= boosts["green"]
+        b_out *= boosts["blue"]
+        np.clip(rgb, 0, 255, out=rgb)
+
+        np.divide(rgb, 255.0, out=self.norm)
+        r, g, b = self.norm[..., 0], self.norm[..., 1], self.norm[..., 2]
+
+        max_rgb, min_rgb, diff = self.max_rgb, self.min_rgb, self.diff
+        np.maximum(r, g, out=max_rgb)
+        np.maximum(max_rgb, b, out=max_rgb)
+        np.minimum(r, g, out=min_rgb)
+        np.minimum(min_rgb, b, out=min_rgb)
+        np.subtract(max_rgb, min_rgb, out=diff)
+
+        saturation = self.saturation
+        saturation.fill(0)
+        np.greater(max_rgb, 0, out=self.valid)
+        np.divide(diff, max_rgb, out=saturation, where=self.valid)
+
+        hue, tmp, valid, mask = self.hue, self.tmp, self.valid, self.mask
+        hue.fill(0)
+        np.greater(diff, 0, out=valid)
+
+        for top, first, second, offset in (
+            (r, g, b, 360),
+            (g, b, r, 120),
+            (b, r, g, 240),
+        ):
+            np.equal(max_rgb, top, out=mask)
+            np.logical_and(mask, valid, out=mask)
+            np.subtract(first, second, out=tmp)
+            np.divide(tmp, diff, out=tmp, where=mask)
+            tmp *= 60
+            tmp += offset
+            np.remainder(tmp, 360, out=tmp)
+            np.copyto(hue, tmp, where=mask)
+
+        hue_config = config["hue_adjustments"]
+
+        for name, channels in (
+            ("yellow", (r_out, g_out)),
+            ("cyan", (g_out, b_out)),
+            ("magenta", (r_out, b_out)),
+        ):
+            boost = hue_config[f"{name}_boost"]
+            if boost == 1.0:
+                continue
+            np.greater_equal(hue, hue_config[f"{name}_hue_min"], out=mask)
+            np.less_equal(hue, hue_config[f"{name}_hue_max"], out=valid)
+            np.logical_and(mask, valid, out=mask)
+            for channel in channels:
+                np.multiply(channel, boost, out=channel, where=mask)
+
+        np.clip(rgb, 0, 255, out=rgb)
+
+        luminance, weight = self.luminance, self.weight
+        np.multiply(r_out, 0.299, out=luminance)
+        np.multiply(g_out, 0.587, out=tmp)
+        luminance += tmp
+        np.multiply(b_out, 0.114, out=tmp)
+        luminance += tmp
+
+        w_config = config["weighting"]
+        np.divide(luminance, 255, out=weight)
+        np.power(weight, w_config["brightness_power"], out=weight)
+        np.power(saturation, w_config["saturation_power"], out=tmp)
+        weight *= tmp
+        weight *= w_config["overall_multiplier"]
+
+        np.less(saturation, w_config["saturation_threshold"], out=mask)
+        np.multiply(weight, 0.1, out=weight, where=mask)
+        np.less(luminance, w_config["luminance_threshold"], out=mask)
+        np.copyto(weight, 0, where=mask)
+
+        return rgb, weight
+
+
+_workspaces = {}
+
+
+def get_workspace(slot, shape):
+    """
+    Get the workspace for a pipeline slot, reallocating only when the shape
+    changes (monitor, crop, auto-crop or downsample)
+    """
+    workspace = _workspaces.get(slot)
+    if workspace is None or workspace.shape != tuple(shape):
+        workspace = ColorWorkspace(shape)
+        _workspaces[slot] = workspace
+    return workspace
@@ -0,0 +1,242 @@
+"""
+XDamage-driven capture for X11
+Subscribes to DAMAGE events on the root window and only regrabs the parts
+of the capture region that actually changed, keeping cached weighted sums
+for a grid of cells. Requires python-xlib and an X server with the DAMAGE
+extension; otherwise the regular full-frame capture is used.
+"""
+
+import os
+import threading
+import numpy as np
+from config import get_config, add_config_listener
+from color_utils import get_active_region
+from kernels import kernel_params
+from workspace import get_workspace
+from downsample import get_downsample
+
+try:
+    from Xlib import display as xdisplay
+    from Xlib.ext import damage
+
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+MAX_PENDING_RECTS = 256
+
+
+def _intersect(a, b):
+    """Intersection of two (left, top, right, bottom) boxes, or None"""
+    left, top = max(a[0], b[0]), max(a[1], b[1])
+    right, bottom = min(a[2], b[2]), min(a[3], b[3])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+class DamageWatcher:
+    """Collects damaged rectangles of the root window in a background thread"""
+
+    def __init__(self, display_name=None):
+        self.display = xdisplay.Display(display_name)
+        if not self.display.has_extension(damage.extname):
+            self.display.close()
+            raise RuntimeError("X server has no DAMAGE extension")
+
+        self.display.damage_query_version(1, 1)
+        root = self.display.screen().root
+        self.damage = root.damage_create(damage.DamageReportRawRectangles)
+        self.display.flush()
+
+        self.events = 0
+        self._rects = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            event = self.display.next_event()
+            if not isinstance(event, damage.DamageNotify):
+                continue
+            area = event.area
+            box = (area.x, area.y, area.x + area.width, area.y + area.height)
+            with self._lock:
+                self.events += 1
+                self._rects.append(box)
+                if len(self._rects) > MAX_PENDING_RECTS:
+                    self._rects = [
+                        (
+                            min(r[0] for r in self._rects),
+                            min(r[1] for r in self._rects),
+                            max(r[2] for r in self._rects),
+                            max(r[3] for r in self._rects),
+                        )
+                    ]
+
+    def take(self, region):
+        """
+        Pop all pending damage and return the parts inside a capture region
+
+        Returns:
+            List of (left, top, right, bottom) boxes in screen coordinates
+        """
+        with self._lock:
+            rects, self._rects = self._rects, []
+
+        bounds = (
+            region["left"],
+            region["top"],
+            region["left"] + region["width"],
+            region["top"] + region["height"],
+        )
+        boxes = (_intersect(rect, bounds) for rect in rects)
+        return [box for box in boxes if box]
+
+
+class DamageCapture:
+    """Weighted mean of the capture region, updated only where damaged"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self.key = None
+        self.color = (0, 0, 0)
+        self.edges_x = None
+        self.edges_y = None
+        self.cell_sums = None
+        self.cell_weights = None
+        self.dirty = None
+        self.cells_grabbed = 0
+
+    def update(self, sct, region, config):
+        """
+        Refresh dirty cells and return the current color
+
+        Returns:
+            Tuple of (RGB color, whether anything was recomputed)
+        """
+        step = get_downsample(config)
+        width, height = region["width"], region["height"]
+        samples_x = len(range(0, width, step))
+        samples_y = len(range(0, height, step))
+        grid = min(config["capture"].get("damage_grid", 8), samples_x, samples_y)
+        grid = max(grid, 1)
+
+        # Cached sums are weighted, so new weighting or boosts need a regrab
+        weights = kernel_params(config).tobytes()
+        key = (region["left"], region["top"], width, height, grid, step, weights)
+        if key != self.key:
+            self.key = key
+            # Cell edges fall on sampling steps, so the cells together sample
+            # exactly the pixels a full downsampled grab would
+            self.edges_x = np.arange(grid + 1) * samples_x // grid
+            self.edges_y = np.arange(grid + 1) * samples_y // grid
+            self.cell_sums = np.zeros((grid, grid, 3))
+            self.cell_weights = np.zeros((grid, grid))
+            self.dirty = np.ones((grid, grid), dtype=bool)
+            self.watcher.take(region)
+
+        pixels_x = self.edges_x * step
+        pixels_y = self.edges_y * step
+        for left, top, right, bottom in self.watcher.take(region):
+            col0 = np.searchsorted(pixels_x, left - region["left"], "right") - 1
+            row0 = np.searchsorted(pixels_y, top - region["top"], "right") - 1
+            col1 = np.searchsorted(pixels_x, right - region["left"])
+            row1 = np.searchsorted(pixels_y, bottom - region["top"])
+            self.dirty[row0:row1, col0:col1] = True
+
+        if not self.dirty.any():
+            return self.color, False
+
+        rows = np.flatnonzero(self.dirty.any(axis=1))
+        cols = np.flatnonzero(self.dirty.any(axis=0))
+        row0, row1 = rows[0], rows[-1] + 1
+        col0, col1 = cols[0], cols[-1] + 1
+
+        left, top = pixels_x[col0], pixels_y[row0]
+        frame = np.asarray(
+            sct.grab(
+                {
+                    "left": region["left"] + int(left),
+                    "top": region["top"] + int(top),
+                    "width": int(min(pixels_x[col1], width) - left),
+                    "height": int(min(pixels_y[row1], height) - top),
+                }
+            )
+        )[::step, ::step]
+
+        workspace = get_workspace("damage", frame.shape[:2])
+        workspace.load_bgra(frame)
+        rgb, weight = workspace.weigh(config)
+        for channel in range(3):
+            rgb[:, :, channel] *= weight
+
+        # One reduction over the dirty block, split back into its cells
+        cuts_y = self.edges_y[row0:row1] - self.edges_y[row0]
+        cuts_x = self.edges_x[col0:col1] - self.edges_x[col0]
+        sums = np.add.reduceat(np.add.reduceat(rgb, cuts_y, axis=0), cuts_x, axis=1)
+        totals = np.add.reduceat(
+            np.add.reduceat(weight, cuts_y, axis=0), cuts_x, axis=1
+        )
+        self.cell_sums[row0:row1, col0:col1] = sums
+        self.cell_weights[row0:row1, col0:col1] = totals
+        self.cells_grabbed += sums.shape[0] * sums.shape[1]
+
+        self.dirty[:] = False
+
+        total = self.cell_weights.sum()
+        if total > 0:
+            self.color = tuple(int(c) for c in self.cell_sums.sum(axis=(0, 1)) / total)
+        else:
+            self.color = (0, 0, 0)
+        return self.color, True
+
+
+_capture = None
+_unavailable = False
+
+
+def _forget_cells(config):
+    """Recompute every cell after the config was loaded, reloaded or saved"""
+    if _capture is not None:
+        _capture.key = None
+
+
+add_config_listener(_forget_cells)
+
+
+def damage_supported():
+    """Whether XDamage capture can be used in this session"""
+    return XLIB_AVAILABLE and bool(os.environ.get("DISPLAY")) and not _unavailable
+
+
+def get_damage_color(sct, monitor_index, config=None):
+    """
+    Capture color driven by XDamage events
+
+    Returns:
+        Tuple of (RGB color, whether the screen changed since the last call),
+        or None if XDamage is not available and the caller should fall back
+    """
+    global _capture, _unavailable
+    if not damage_supported():
+        return None
+
+    if _capture is None:
+        try:
+            _capture = DamageCapture(DamageWatcher())
+        except Exception as e:
+            print(f"XDamage capture unavailable, using full capture: {e}")
+            _unavailable = True
+            return None
+
+    config = config or get_config()
+    try:
+        region = get_active_region(sct, monitor_index, config)
+        return _capture.update(sct, region, config)
+    except Exception as e:
+        # Like a failed full-frame grab: log it and try again next frame.
+        # Dirty cells stay marked until a grab of them succeeds.
+        print(f"Error: {e}")
+        return None
@@ -0,0 +1,237 @@
+"""
+Window capture target for X11
+Tracks either the focused window (_NET_ACTIVE_WINDOW) or the first window
+whose class or title contains capture.window_match, and keeps its
+on-screen rectangle cached. The rectangle is only recomputed on focus,
+configure, map and unmap events, so per-frame cost is one lookup and the
+grab covers just the window. Requires python-xlib; without it, or with
+no matching window, the monitor is captured as usual.
+"""
+
+import os
+import threading
+from config import get_config
+
+try:
+    from Xlib import X, Xatom, display as xdisplay, error as xerror
+
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+SEARCH_DEPTH = 2
+
+
+class WindowTracker:
+    """Follows one target window and caches its rectangle in root coordinates"""
+
+    def __init__(self, match=None, display_name=None):
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        self.match = match
+        self.atoms = {
+            name: self.display.intern_atom(name)
+            for name in (
+                "_NET_ACTIVE_WINDOW",
+                "_NET_CLIENT_LIST",
+                "_NET_WM_NAME",
+                "_NET_WM_PID",
+                "UTF8_STRING",
+            )
+        }
+        self.window = None
+        self.rect = None
+        self.updates = 0
+        self._lock = threading.Lock()
+
+        mask = X.PropertyChangeMask
+        if match:
+            # New top-level windows may be the one we are looking for
+            mask |= X.SubstructureNotifyMask
+        self.root.change_attributes(event_mask=mask)
+        self._retarget()
+        self.display.flush()
+
+        self._thread = threading.Thread(target=self._run, name="window", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                event = self.display.next_event()
+            except Exception:
+                # Display closed by close(), or the X server went away
+                return
+            try:
+                self._handle(event)
+            except xerror.XError:
+                # The window vanished between the event and our request
+                self._set_target(None)
+
+    def _handle(self, event):
+        window = self.window
+        source = getattr(event, "window", None)
+        target = window is not None and source is not None and source.id == window.id
+        if event.type == X.PropertyNotify:
+            if event.atom in (
+                self.atoms["_NET_ACTIVE_WINDOW"],
+                self.atoms["_NET_CLIENT_LIST"],
+            ):
+                self._retarget()
+        elif event.type in (X.ConfigureNotify, X.MapNotify) and target:
+            self._update_geometry()
+        elif event.type == X.UnmapNotify and target:
+            self._set_rect(None)
+        elif event.type == X.DestroyNotify and target:
+            self._set_target(None)
+            self._retarget()
+        elif event.type == X.MapNotify and self.match and window is None:
+            self._retarget()
+
+    def _text(self, window, atom, kind):
+        try:
+            return window.get_full_text_property(atom, kind) or ""
+        except xerror.XError:
+            return ""
+
+    def _matches(self, window):
+        try:
+            names = list(window.get_wm_class() or ())
+        except xerror.XError:
+            return False
+        names.append(
+            self._text(window, self.atoms["_NET_WM_NAME"], self.atoms["UTF8_STRING"])
+            or self._text(window, Xatom.WM_NAME, X.AnyPropertyType)
+        )
+        match = self.match.lower()
+        return any(match in name.lower() for name in names if name)
+
+    def _find_match(self, parent, depth=SEARCH_DEPTH):
+        """First mapped window below parent (down to depth) that matches"""
+        try:
+            children = parent.query_tree().children
+        except xerror.XError:
+            return None
+        for child in reversed(children):
+            try:
+                mapped = child.get_attributes().map_state == X.IsViewable
+            except xerror.XError:
+                continue
+            if mapped and self._matches(child):
+                return child
+            if depth > 1:
+                found = self._find_match(child, depth - 1)
+                if found is not None:
+                    return found
+        return None
+
+    def _own_window(self, window):
+        try:
+            pid = window.get_full_property(self.atoms["_NET_WM_PID"], X.AnyPropertyType)
+        except xerror.XError:
+            return False
+        return bool(pid and pid.value and pid.value[0] == os.getpid())
+
+    def _retarget(self):
+        """Pick the target window again after focus or the window list changed"""
+        if self.match:
+            self._set_target(self._find_match(self.root))
+            return
+
+        prop = self.root.get_full_property(
+            self.atoms["_NET_ACTIVE_WINDOW"], X.AnyPropertyType
+        )
+        if not prop or not prop.value or not prop.value[0]:
+            return
+        window = self.display.create_resource_object("window", prop.value[0])
+        # Focusing our own settings window keeps capturing the previous one
+        if not self._own_window(window):
+            self._set_target(window)
+
+    def _set_target(self, window):
+        old = self.window
+        if old is not None and window is not None and old.id == window.id:
+            return
+        if old is not None:
+            old.change_attributes(event_mask=X.NoEventMask, onerror=lambda *_: None)
+        self.window = window
+        if window is None:
+            self._set_rect(None)
+            return
+        window.change_attributes(event_mask=X.StructureNotifyMask)
+        self._update_geometry()
+
+    def _update_geometry(self):
+        geometry = self.window.get_geometry()
+        origin = self.root.translate_coords(self.window, 0, 0)
+        if self.window.get_attributes().map_state != X.IsViewable:
+            self._set_rect(None)
+            return
+
+        # mss cannot grab outside the screen, so clip to the root window
+        screen = self.root.get_geometry()
+        left, top = max(origin.x, 0), max(origin.y, 0)
+        right = min(origin.x + geometry.width, screen.width)
+        bottom = min(origin.y + geometry.height, screen.height)
+        if right <= left or bottom <= top:
+            self._set_rect(None)
+            return
+        self._set_rect(
+            {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        )
+
+    def _set_rect(self, rect):
+        with self._lock:
+            if rect != self.rect:
+                self.rect = rect
+                self.updates += 1
+
+    def close(self):
+        self.display.close()
+
+
+_tracker = None
+_unavailable = False
+
+
+def window_capture_enabled(config):
+    return config["capture"].get("target", "monitor") != "monitor"
+
+
+def get_window_rect(config=None):
+    """
+    Rectangle of the tracked window
+
+    Returns:
+        Dict with left, top, width and height, or None when the monitor
+        should be captured instead (monitor target, no X11, no window)
+    """
+    global _tracker, _unavailable
+    config = config or get_config()
+    if not window_capture_enabled(config) or _unavailable:
+        return None
+
+    capture = config["capture"]
+    match = None
+    if capture.get("target") == "window":
+        match = capture.get("window_match") or None
+
+    if _tracker is None or _tracker.match != match:
+        if not XLIB_AVAILABLE or not os.environ.get("DISPLAY"):
+            print("Window capture needs python-xlib and X11, capturing the monitor")
+            _unavailable = True
+            return None
+        try:
+            if _tracker is not None:
+                _tracker.close()
+            _tracker = WindowTracker(match)
+        except Exception as e:
+            print(f"Window capture unavailable, capturing the monitor: {e}")
+            _tracker = None
+            _unavailable = True
+            return None
+    return _tracker.rect
+
+
+def get_tracker():
+    return _tracker